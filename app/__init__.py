@@ -1,9 +1,13 @@
 from flask import Flask, app, jsonify
 from flask_migrate import Migrate
-from .extensions import db, jwt
+from .extensions import (db, jwt, spatial, cache, db_tuning, hasher, user_cache, blocklist,
+                         shedder, limiter, metrics, nplusone)
 from .routes.auth_routes import auth_bp
 from .routes.posts_routes import posts_bp
 from .routes.services_routes import services_bp
+from .routes.export_routes import export_bp
+from .routes.sync_routes import sync_bp
+from .routes.search_routes import search_bp
 from app.routes import auth_bp, posts_bp, main_bp
 from flask_jwt_extended import JWTManager
 
@@ -27,8 +31,20 @@ def create_app(config_object=None):
 
     
     db.init_app(app)
+    db_tuning.init_app(app, db)
+    # first before_request hook, so latency covers shedding, throttling and JWT checks
+    metrics.init_app(app, db)
+    nplusone.init_app(app, db)
     migrate.init_app(app, db)
     jwt.init_app(app)
+    spatial.init_app(app)
+    cache.init_app(app)
+    hasher.init_app(app)
+    user_cache.init_app(app)
+    blocklist.init_app(app)
+    # shed load before doing any per-request work, then apply per-route RATE_LIMITS
+    shedder.init_app(app)
+    limiter.init_app(app)
      
     @jwt.invalid_token_loader
     def invalid_token_callback(reason):
@@ -41,11 +57,30 @@ def create_app(config_object=None):
     @jwt.expired_token_loader
     def expired_token_callback(jwt_header, jwt_payload):
         return jsonify({"msg": "Token expired"}), 401
+
+    @jwt.user_lookup_loader
+    def user_lookup_callback(jwt_header, jwt_payload):
+        return user_cache.load(jwt_payload["sub"])
+
+    @jwt.token_in_blocklist_loader
+    def token_in_blocklist_callback(jwt_header, jwt_payload):
+        return blocklist.is_revoked(jwt_payload["jti"])
+
+    @jwt.revoked_token_loader
+    def revoked_token_callback(jwt_header, jwt_payload):
+        return jsonify({"msg": "Token revoked"}), 401
   
 
     app.register_blueprint(posts_bp, url_prefix='/posts')
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(services_bp, url_prefix='/services')
     app.register_blueprint(main_bp)
+    app.register_blueprint(export_bp)
+    app.register_blueprint(sync_bp)
+    app.register_blueprint(search_bp)
+
+    from .cli import import_data_command, rebuild_matches_command
+    app.cli.add_command(rebuild_matches_command)
+    app.cli.add_command(import_data_command)
 
     return app
@@ -0,0 +1,164 @@
+import csv
+import json
+import os
+import time
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import Boolean, DateTime, Float, Integer, func, select
+
+
+@click.command('rebuild-matches')
+@with_appcontext
+def rebuild_matches_command():
+    """Recompute the request_offer_match table from scratch."""
+    from app.matching import rebuild_all_matches
+
+    total = rebuild_all_matches()
+    click.echo(f"Stored {total} request/offer matches")
+
+
+def _read_rows(path, fmt):
+    with open(path, newline='', encoding='utf-8') as fh:
+        if fmt == 'csv':
+            yield from csv.DictReader(fh)
+        else:
+            for line in fh:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _coerce(column, value):
+    """Convert a CSV/NDJSON field to the column's Python type; '' counts as missing."""
+    if value is None or value == '':
+        return None
+    if isinstance(column.type, Float):
+        return float(value)
+    if isinstance(column.type, Integer):
+        return int(value)
+    if isinstance(column.type, Boolean):
+        return value if isinstance(value, bool) else str(value).lower() in ('1', 'true', 'yes')
+    if isinstance(column.type, DateTime):
+        return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+    return str(value)
+
+
+def _default(column):
+    default = column.default
+    if default is None:
+        return None
+    return default.arg(None) if default.is_callable else default.arg
+
+
+def _prepare(table, raw, has_geohash):
+    """Map one input record onto the table's columns, filling defaults and derived fields."""
+    if 'password' in raw and 'password' in table.c:
+        # already-hashed values can be passed as password_hash to skip the (slow) KDF
+        from app.extensions import hasher
+
+        raw = dict(raw, password=raw.get('password_hash') or hasher.hash(raw['password']))
+    elif 'password_hash' in raw:
+        raw = dict(raw, password=raw['password_hash'])
+    row = {}
+    for column in table.columns:
+        if column.name == 'geohash':
+            continue
+        value = _coerce(column, raw.get(column.name))
+        if value is None and not column.primary_key:
+            value = _default(column)
+        if value is not None or not column.primary_key:
+            row[column.name] = value
+    if has_geohash:
+        from app.utils.geo import geohash_encode
+
+        lat, lon = row.get('latitude'), row.get('longitude')
+        row['geohash'] = geohash_encode(lat, lon) if lat is not None and lon is not None else None
+    return row
+
+
+def _advance_id_sequence(session, table):
+    """Move ``table``'s id sequence past ids inserted explicitly (Postgres only)."""
+    dialect = session.get_bind().dialect
+    if dialect.name != 'postgresql':
+        return
+    max_id = func.max(table.c.id)
+    sequence = func.pg_get_serial_sequence(dialect.identifier_preparer.format_table(table), 'id')
+    session.execute(select(func.setval(sequence, func.coalesce(max_id, 1), max_id.isnot(None))))
+    session.commit()
+
+
+def import_rows(model, records, batch_size=5000, session=None):
+    """Insert ``records`` (dicts) into ``model``'s table with Core executemany, one commit per batch.
+
+    Bypasses the ORM unit of work and its events; callers must rebuild
+    matches afterwards. Spatial indexes pick the new ids up on their next
+    sync. Records may carry their own ``id``; the id sequence is then moved
+    past them so later ORM inserts do not collide. Returns the row count.
+    """
+    from app.extensions import db
+
+    session = session or db.session
+    table = model.__table__
+    has_geohash = 'geohash' in table.c
+    stmt = table.insert()
+    total = 0
+    batch = []
+    explicit_ids = False
+
+    def flush():
+        # executemany needs one key set per statement
+        by_keys = {}
+        for row in batch:
+            by_keys.setdefault(tuple(row), []).append(row)
+        for rows in by_keys.values():
+            session.execute(stmt, rows)
+        session.commit()
+
+    for raw in records:
+        batch.append(_prepare(table, raw, has_geohash))
+        explicit_ids = explicit_ids or 'id' in batch[-1]
+        if len(batch) >= batch_size:
+            flush()
+            total += len(batch)
+            batch = []
+    if batch:
+        flush()
+        total += len(batch)
+    if explicit_ids:
+        _advance_id_sequence(session, table)
+    return total
+
+
+# response cache namespaces holding each kind's rows
+_CACHE_NAMESPACES = {'posts': ('posts',), 'requests': ('matches',), 'offers': ('matches', 'offers')}
+
+
+@click.command('import-data')
+@click.argument('kind', type=click.Choice(['users', 'posts', 'requests', 'offers']))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']),
+              help='Input format; inferred from the file extension by default.')
+@click.option('--batch-size', default=5000, show_default=True, help='Rows per INSERT/commit.')
+@click.option('--skip-matches', is_flag=True, help="Don't rebuild request/offer matches afterwards.")
+@with_appcontext
+def import_data_command(kind, path, fmt, batch_size, skip_matches):
+    """Bulk-load KIND rows from a CSV or NDJSON file at PATH."""
+    from app.extensions import cache
+    from app.matching import rebuild_all_matches
+    from app.models import Post, ServiceOffer, ServiceRequest, User
+
+    model = {'users': User, 'posts': Post, 'requests': ServiceRequest, 'offers': ServiceOffer}[kind]
+    fmt = fmt or ('csv' if os.path.splitext(path)[1].lower() == '.csv' else 'ndjson')
+
+    started = time.perf_counter()
+    total = import_rows(model, _read_rows(path, fmt), batch_size=max(1, batch_size))
+    elapsed = time.perf_counter() - started
+    click.echo(f"Imported {total} {kind} in {elapsed:.2f}s ({total / elapsed if elapsed else 0:.0f} rows/s)")
+
+    # web workers' spatial indexes catch up on their own (new ids); cached responses
+    # are dropped here, for every worker when the cache backend is shared
+    if kind in ('requests', 'offers') and not skip_matches:
+        click.echo(f"Stored {rebuild_all_matches()} request/offer matches")
+    if model is not User:
+        cache.invalidate(*_CACHE_NAMESPACES[kind])
@@ -2,11 +2,30 @@ import logging
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager, get_jwt_identity
+from app.utils.cache import ResponseCache
+from app.utils.db_tuning import DatabaseTuning
+from app.utils.metrics import Metrics
+from app.utils.query_guard import NPlusOneDetector
+from app.utils.rate_limit import LoadShedder, RateLimiter
+from app.utils.read_replicas import RoutingSession
+from app.utils.identity import TokenBlocklist, UserCache
+from app.utils.security import PasswordHasher
+from app.utils.spatial_index import SpatialIndex
 
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 jwt = JWTManager()
+spatial = SpatialIndex()
+cache = ResponseCache()
+db_tuning = DatabaseTuning()
+hasher = PasswordHasher()
+user_cache = UserCache()
+blocklist = TokenBlocklist()
+shedder = LoadShedder()
+limiter = RateLimiter()
+metrics = Metrics()
+nplusone = NPlusOneDetector()
 
 logger = logging.getLogger("kasilink")
 logger.setLevel(logging.DEBUG)
\ No newline at end of file
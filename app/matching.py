@@ -0,0 +1,302 @@
+"""Incremental maintenance of the ``request_offer_match`` table.
+
+Matches are computed once when a ServiceRequest is created and re-evaluated
+only for the requests that can reach an offer when that offer is created,
+moved or deleted. Reads (``GET /services/matches/<id>``) then become a single
+indexed, distance-ordered query.
+
+Candidates come from the persisted geohash columns rather than the in-process
+grid index, so the table stays consistent across worker processes. Refreshes
+take a per-category lock (``lock_categories``) so a request and an offer
+created concurrently still find each other.
+"""
+from collections import defaultdict
+
+import numpy as np
+from sqlalchemy import delete, func, insert, select
+
+from app.extensions import db, metrics
+from app.models import RequestOfferMatch, ServiceOffer, ServiceRequest
+from app.utils.geo import geohash_cover, haversine_km, pairwise_haversine_km
+from app.utils.spatial_index import fetch_by_ids, geohash_clause, geohash_prefix_clause
+
+
+def _insert_matches(session, rows):
+    if rows:
+        session.execute(insert(RequestOfferMatch), rows)
+
+
+def lock_categories(session, categories):
+    """Serialize match refreshes per category until the transaction ends.
+
+    Under READ COMMITTED a request and an offer created concurrently would
+    each refresh without seeing the other's uncommitted row, and the pair
+    would never be matched. With a transaction-scoped advisory lock per
+    category the second refresh waits for the first commit and then sees its
+    row. SQLite already serializes writers, so nothing is locked there.
+    """
+    if session.get_bind().dialect.name != 'postgresql':
+        return
+    for category in sorted({c for c in categories if c is not None}):
+        session.execute(select(func.pg_advisory_xact_lock(func.hashtext(category))))
+
+
+def refresh_request_matches(sr, session=None):
+    """Recompute stored matches for one ServiceRequest (must be flushed)."""
+    session = session or db.session
+    session.execute(delete(RequestOfferMatch).where(RequestOfferMatch.request_id == sr.id))
+    if sr.deleted or sr.latitude is None or sr.longitude is None:
+        return 0
+    lock_categories(session, [sr.category])
+    radius_km = sr.radius_km or 0
+    candidates = session.execute(
+        select(ServiceOffer.id, ServiceOffer.latitude, ServiceOffer.longitude).where(
+            ServiceOffer.category == sr.category,
+            ServiceOffer.deleted.isnot(True),
+            geohash_clause(ServiceOffer.geohash, sr.latitude, sr.longitude, radius_km),
+        )
+    ).all()
+    metrics.observe_candidates('ServiceOffer', len(candidates))
+    rows = []
+    if candidates:
+        ids, lats, lons = zip(*candidates)
+        distances = haversine_km(sr.latitude, sr.longitude, lats, lons)
+        rows = [{'request_id': sr.id, 'offer_id': ids[i], 'distance_km': float(distances[i])}
+                for i in (distances <= radius_km).nonzero()[0]]
+    _insert_matches(session, rows)
+    return len(rows)
+
+
+def refresh_offer_matches(offer, session=None):
+    """Re-evaluate only the requests whose radius can reach ``offer``."""
+    session = session or db.session
+    remove_offer_matches(offer.id, session=session)
+    if offer.deleted or offer.latitude is None or offer.longitude is None:
+        return 0
+    lock_categories(session, [offer.category])
+    # no request in this category can reach further than the largest radius
+    max_radius = session.scalar(
+        select(func.max(ServiceRequest.radius_km))
+        .where(ServiceRequest.category == offer.category, ServiceRequest.deleted.isnot(True))
+    )
+    if not max_radius:
+        return 0
+    candidates = session.execute(
+        select(ServiceRequest.id, ServiceRequest.latitude, ServiceRequest.longitude,
+               ServiceRequest.radius_km).where(
+            ServiceRequest.category == offer.category,
+            ServiceRequest.deleted.isnot(True),
+            geohash_clause(ServiceRequest.geohash, offer.latitude, offer.longitude, max_radius),
+        )
+    ).all()
+    metrics.observe_candidates('ServiceRequest', len(candidates))
+    rows = []
+    if candidates:
+        ids, lats, lons, radii = zip(*candidates)
+        distances = haversine_km(offer.latitude, offer.longitude, lats, lons)
+        rows = [{'request_id': ids[i], 'offer_id': offer.id, 'distance_km': float(d)}
+                for i, d in enumerate(distances) if d <= (radii[i] or 0)]
+    _insert_matches(session, rows)
+    return len(rows)
+
+
+def remove_offer_matches(offer_id, session=None):
+    session = session or db.session
+    session.execute(delete(RequestOfferMatch).where(RequestOfferMatch.offer_id == offer_id))
+
+
+def remove_request_matches(request_id, session=None):
+    session = session or db.session
+    session.execute(delete(RequestOfferMatch).where(RequestOfferMatch.request_id == request_id))
+
+
+def rebuild_all_matches(session=None, batch_size=500):
+    """Recompute the whole table, e.g. after a migration or a bulk import."""
+    session = session or db.session
+    session.execute(delete(RequestOfferMatch))
+    total = 0
+    last_id = 0
+    while True:
+        batch = session.scalars(
+            select(ServiceRequest).where(ServiceRequest.id > last_id, ServiceRequest.deleted.isnot(True))
+            .order_by(ServiceRequest.id).limit(batch_size)
+        ).all()
+        if not batch:
+            break
+        for sr in batch:
+            total += refresh_request_matches(sr, session=session)
+        last_id = batch[-1].id
+        session.commit()
+        session.expunge_all()
+    session.commit()
+    return total
+
+
+def stored_matches(request_id, session=None):
+    """Return ``[(offer, distance_km), ...]`` from the match table, nearest first."""
+    session = session or db.session
+    return session.execute(
+        select(ServiceOffer, RequestOfferMatch.distance_km)
+        .join(RequestOfferMatch, RequestOfferMatch.offer_id == ServiceOffer.id)
+        .where(RequestOfferMatch.request_id == request_id)
+        .order_by(RequestOfferMatch.distance_km, ServiceOffer.id)
+    ).all()
+
+
+def stored_offer_matches(offer, session=None):
+    """Return ``[(request, distance_km), ...]`` this offer can serve, nearest first.
+
+    Stored rows already satisfy the requester's radius; additionally bounding
+    by the offer's own radius gives mutual-radius semantics.
+    """
+    session = session or db.session
+    return session.execute(
+        select(ServiceRequest, RequestOfferMatch.distance_km)
+        .join(RequestOfferMatch, RequestOfferMatch.request_id == ServiceRequest.id)
+        .where(RequestOfferMatch.offer_id == offer.id,
+               RequestOfferMatch.distance_km <= (offer.radius_km or 0))
+        .order_by(RequestOfferMatch.distance_km, ServiceRequest.id)
+    ).all()
+
+
+# upper bound on cells in one distance-matrix block (requests x offers)
+MATRIX_BLOCK_CELLS = 2_000_000
+# beyond this many covering prefixes, filtering on category alone is cheaper
+MAX_BATCH_PREFIXES = 256
+
+
+def _request_hits(session, requests):
+    """``[(request_id, offer_id, distance_km), ...]`` for ``requests`` via one matrix per category."""
+    by_category = defaultdict(list)
+    for sr in requests:
+        if not sr.deleted and sr.latitude is not None and sr.longitude is not None:
+            by_category[sr.category].append(sr)
+
+    hits = []
+    for category, group in by_category.items():
+        prefixes = set()
+        for sr in group:
+            prefixes.update(geohash_cover(sr.latitude, sr.longitude, sr.radius_km or 0))
+        stmt = select(ServiceOffer.id, ServiceOffer.latitude, ServiceOffer.longitude).where(
+            ServiceOffer.category == category,
+            ServiceOffer.deleted.isnot(True),
+            ServiceOffer.latitude.isnot(None),
+            ServiceOffer.longitude.isnot(None),
+        )
+        if len(prefixes) <= MAX_BATCH_PREFIXES:
+            stmt = stmt.where(geohash_prefix_clause(ServiceOffer.geohash, sorted(prefixes)))
+        candidates = session.execute(stmt).all()
+        if not candidates:
+            continue
+
+        offer_ids, lats, lons = (np.asarray(c) for c in zip(*candidates))
+        radii = np.array([sr.radius_km or 0 for sr in group], dtype=np.float64)
+        req_lats = np.array([sr.latitude for sr in group], dtype=np.float64)
+        req_lons = np.array([sr.longitude for sr in group], dtype=np.float64)
+        step = max(1, MATRIX_BLOCK_CELLS // len(offer_ids))
+        for start in range(0, len(group), step):
+            block = slice(start, start + step)
+            dist = pairwise_haversine_km(req_lats[block], req_lons[block], lats, lons)
+            rows, cols = np.nonzero(dist <= radii[block, None])
+            hits.extend((group[start + r].id, int(offer_ids[c]), float(dist[r, c]))
+                        for r, c in zip(rows, cols))
+    return hits
+
+
+def _offer_hits(session, offers):
+    """Reverse of ``_request_hits``: requests whose radius reaches any of ``offers``."""
+    by_category = defaultdict(list)
+    for o in offers:
+        if not o.deleted and o.latitude is not None and o.longitude is not None:
+            by_category[o.category].append(o)
+
+    hits = []
+    for category, group in by_category.items():
+        max_radius = session.scalar(
+            select(func.max(ServiceRequest.radius_km))
+            .where(ServiceRequest.category == category, ServiceRequest.deleted.isnot(True))
+        )
+        if not max_radius:
+            continue
+        prefixes = set()
+        for o in group:
+            prefixes.update(geohash_cover(o.latitude, o.longitude, max_radius))
+        stmt = select(ServiceRequest.id, ServiceRequest.latitude, ServiceRequest.longitude,
+                      ServiceRequest.radius_km).where(
+            ServiceRequest.category == category,
+            ServiceRequest.deleted.isnot(True),
+            ServiceRequest.latitude.isnot(None),
+            ServiceRequest.longitude.isnot(None),
+        )
+        if len(prefixes) <= MAX_BATCH_PREFIXES:
+            stmt = stmt.where(geohash_prefix_clause(ServiceRequest.geohash, sorted(prefixes)))
+        candidates = session.execute(stmt).all()
+        if not candidates:
+            continue
+
+        request_ids, lats, lons, radii = zip(*candidates)
+        request_ids = np.asarray(request_ids)
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        radii = np.array([r or 0 for r in radii], dtype=np.float64)
+        offer_lats = np.array([o.latitude for o in group], dtype=np.float64)
+        offer_lons = np.array([o.longitude for o in group], dtype=np.float64)
+        step = max(1, MATRIX_BLOCK_CELLS // len(request_ids))
+        for start in range(0, len(group), step):
+            block = slice(start, start + step)
+            dist = pairwise_haversine_km(offer_lats[block], offer_lons[block], lats, lons)
+            rows, cols = np.nonzero(dist <= radii[None, :])
+            hits.extend((int(request_ids[c]), group[start + r].id, float(dist[r, c]))
+                        for r, c in zip(rows, cols))
+    return hits
+
+
+def _chunks(ids, size=500):
+    ids = list(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def refresh_matches_for_requests(request_ids, session=None):
+    """Batch form of ``refresh_request_matches`` for freshly bulk-inserted requests."""
+    session = session or db.session
+    for chunk in _chunks(request_ids):
+        session.execute(delete(RequestOfferMatch).where(RequestOfferMatch.request_id.in_(chunk)))
+    requests = fetch_by_ids(session, ServiceRequest, request_ids)
+    lock_categories(session, [sr.category for sr in requests])
+    hits = _request_hits(session, requests)
+    _insert_matches(session, [{'request_id': r, 'offer_id': o, 'distance_km': d} for r, o, d in hits])
+    return len(hits)
+
+
+def refresh_matches_for_offers(offer_ids, session=None):
+    """Batch form of ``refresh_offer_matches``: one candidate query and matrix per category."""
+    session = session or db.session
+    for chunk in _chunks(offer_ids):
+        session.execute(delete(RequestOfferMatch).where(RequestOfferMatch.offer_id.in_(chunk)))
+    offers = fetch_by_ids(session, ServiceOffer, offer_ids)
+    lock_categories(session, [o.category for o in offers])
+    hits = _offer_hits(session, offers)
+    _insert_matches(session, [{'request_id': r, 'offer_id': o, 'distance_km': d} for r, o, d in hits])
+    return len(hits)
+
+
+def match_many(request_ids, session=None):
+    """Match many ServiceRequests in one pass.
+
+    Candidate offers are loaded once per category (restricted to the union of
+    the requests' geohash covers) and all request x offer distances are
+    computed as one vectorized matrix. Returns ``{request_id: [(offer,
+    distance_km), ...]}`` nearest first; unknown ids are omitted.
+    """
+    session = session or db.session
+    requests = [sr for sr in fetch_by_ids(session, ServiceRequest, dict.fromkeys(request_ids))
+                if not sr.deleted]
+    results = {sr.id: [] for sr in requests}
+    hits = _request_hits(session, requests)
+
+    offers = {o.id: o for o in fetch_by_ids(session, ServiceOffer, {h[1] for h in hits})}
+    for request_id, offer_id, distance in sorted(hits, key=lambda h: (h[0], h[2], h[1])):
+        if offer_id in offers:
+            results[request_id].append((offers[offer_id], distance))
+    return results
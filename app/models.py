@@ -1,9 +1,11 @@
 from datetime import datetime
 from app import db
-from app.extensions import db
-from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy import Integer, String, Text, ForeignKey, Boolean, DateTime
+from app.extensions import db, spatial, hasher
+from app.scoring import rank_offers
+from app.utils.geo import geohash_encode, haversine_km, radius_filter
+from app.utils.spatial_index import track, fetch_by_ids, geohash_clause
+import numpy as np
+from sqlalchemy import Integer, String, Text, ForeignKey, Boolean, DateTime, event, select
 
 
 class User(db.Model):
@@ -20,14 +22,26 @@ class User(db.Model):
     
     @password.setter
     def password(self, password):
-        self._password = generate_password_hash(password)
+        self._password = hasher.hash(password)
     
     def verify_password(self, password):
-        return check_password_hash(self._password, password)
+        """Check ``password``; upgrades an outdated stored hash in place (caller commits)."""
+        ok, new_hash = hasher.verify(password, self._password)
+        if ok and new_hash:
+            self._password = new_hash
+        return ok
 
 
 
 class Post(db.Model):
+    __table_args__ = (
+        db.Index('ix_post_geohash', 'geohash'),
+        db.Index('ix_post_category_geohash', 'category', 'geohash'),
+        db.Index('ix_post_created_at_id', 'created_at', 'id'),
+        db.Index('ix_post_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+        db.Index('ix_post_updated_at_id', 'updated_at', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
     content = db.Column(db.Text, nullable=False)
@@ -36,6 +50,7 @@ class Post(db.Model):
     location = db.Column(db.String(100))
     latitude = db.Column(db.Float, nullable=True)
     longitude = db.Column(db.Float, nullable=True)
+    geohash = db.Column(db.String(12), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     deleted = db.Column(db.Boolean, default=False) 
@@ -46,6 +61,10 @@ class Post(db.Model):
 
 class ServiceRequest(db.Model):
     __tablename__ = 'service_requests'
+    __table_args__ = (
+        db.Index('ix_service_requests_category_geohash', 'category', 'geohash'),
+        db.Index('ix_service_requests_updated_at_id', 'updated_at', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
@@ -56,53 +75,44 @@ class ServiceRequest(db.Model):
     latitude = db.Column(db.Float, nullable=True)
     longitude = db.Column(db.Float, nullable=True)
     radius_km = db.Column(db.Float, default=10.0)
+    geohash = db.Column(db.String(12), nullable=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    deleted = db.Column(db.Boolean, default=False)  # tombstone, kept for /sync
 
     user = db.relationship('User', backref=db.backref('service_requests', lazy=True))
 
-    def match(self, session=None):
-        """Return ServiceOffer objects in same category and within radius_km.
+    def match(self, session=None, profile=None):
+        """Return ServiceOffer objects in same category and within radius_km, best first.
 
-        This is a simple, DB-agnostic implementation that loads candidate offers
-        with coordinates and filters in Python using the Haversine formula.
-        For production, replace with a spatial index (PostGIS) or bounding-box filter.
+        Candidate offers come from the in-process grid index (only cells that
+        overlap the search circle are visited); distances for the whole
+        candidate batch are then computed in one vectorized pass, and the
+        survivors are ordered by the blended score of scoring ``profile``
+        (``MATCH_SCORING_PROFILE`` by default).
         """
-        from math import radians, sin, cos, atan2, sqrt
-
-        def haversine_km(lat1, lon1, lat2, lon2):
-            R = 6371.0
-            dlat = radians(lat2 - lat1)
-            dlon = radians(lon2 - lon1)
-            a = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2) ** 2
-            c = 2 * atan2(sqrt(a), sqrt(1 - a))
-            return R * c
-
         if self.latitude is None or self.longitude is None:
             return []
 
         # Use provided session or the global db.session
         session = session or db.session
+        radius_km = self.radius_km or 0
 
-        candidates = session.query(ServiceOffer).filter(
-            ServiceOffer.category == self.category,
-            ServiceOffer.latitude.isnot(None),
-            ServiceOffer.longitude.isnot(None)
-        ).all()
-
-        results = []
-        for offer in candidates:
-            dist = haversine_km(self.latitude, self.longitude, offer.latitude, offer.longitude)
-            if dist <= (self.radius_km or 0):
-                results.append((offer, dist))
-
-        # sort by distance
-        results.sort(key=lambda x: x[1])
-        return [o for o, d in results]
+        candidates = spatial.candidates(ServiceOffer, self.latitude, self.longitude, radius_km,
+                                        bucket=self.category, session=session)
+        distances = dict(radius_filter(self.latitude, self.longitude, candidates, radius_km))
+        offers = fetch_by_ids(session, ServiceOffer, list(distances))
+        ranked = rank_offers(self, [(o, distances[o.id]) for o in offers], profile=profile)
+        return [o for o, _, _ in ranked]
 
 
 class ServiceOffer(db.Model):
     __tablename__ = 'service_offers'
+    __table_args__ = (
+        db.Index('ix_service_offers_category_geohash', 'category', 'geohash'),
+        db.Index('ix_service_offers_updated_at_id', 'updated_at', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
@@ -113,10 +123,82 @@ class ServiceOffer(db.Model):
     latitude = db.Column(db.Float, nullable=True)
     longitude = db.Column(db.Float, nullable=True)
     radius_km = db.Column(db.Float, default=10.0)
+    geohash = db.Column(db.String(12), nullable=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    deleted = db.Column(db.Boolean, default=False)  # tombstone, kept for /sync
 
     user = db.relationship('User', backref=db.backref('service_offers', lazy=True))
 
+    def match(self, session=None):
+        """Return ServiceRequest objects this offer can serve, nearest first.
+
+        Mutual-radius semantics: the distance must be within both the
+        requester's radius_km and this offer's radius_km. Since the offer's
+        radius bounds the search, candidates are an indexed (category,
+        geohash) lookup around the offer rather than a scan of all requests.
+        """
+        if self.latitude is None or self.longitude is None:
+            return []
+
+        session = session or db.session
+        radius_km = self.radius_km or 0
+
+        rows = session.execute(
+            select(ServiceRequest.id, ServiceRequest.latitude, ServiceRequest.longitude,
+                   ServiceRequest.radius_km).where(
+                ServiceRequest.category == self.category,
+                ServiceRequest.deleted.isnot(True),
+                geohash_clause(ServiceRequest.geohash, self.latitude, self.longitude, radius_km),
+            )
+        ).all()
+        if not rows:
+            return []
+        ids, lats, lons, radii = zip(*rows)
+        distances = haversine_km(self.latitude, self.longitude, lats, lons)
+        reach = np.minimum(np.array([r or 0 for r in radii], dtype=float), radius_km)
+        hits = sorted((float(distances[i]), ids[i]) for i in (distances <= reach).nonzero()[0])
+        return fetch_by_ids(session, ServiceRequest, [k for _, k in hits])
+
+
+track(Post, exclude='deleted')
+track(ServiceOffer, bucket='category', exclude='deleted')
+
+
+class RequestOfferMatch(db.Model):
+    """Precomputed ServiceRequest -> ServiceOffer matches (see app.matching)."""
+    __tablename__ = 'request_offer_match'
+    __table_args__ = (
+        db.Index('ix_request_offer_match_request_distance', 'request_id', 'distance_km'),
+        db.Index('ix_request_offer_match_offer_id', 'offer_id'),
+    )
+
+    request_id = db.Column(db.Integer, db.ForeignKey('service_requests.id', ondelete='CASCADE'),
+                           primary_key=True)
+    offer_id = db.Column(db.Integer, db.ForeignKey('service_offers.id', ondelete='CASCADE'),
+                         primary_key=True)
+    distance_km = db.Column(db.Float, nullable=False)
+
+
+class RevokedToken(db.Model):
+    """JWT ids revoked before expiry (logout); mirrored in memory by app.utils.identity."""
+    __tablename__ = 'revoked_token'
+
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(64), nullable=False, unique=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # workers sync by it
+
+
+def _set_geohash(mapper, connection, target):
+    """Keep the persisted geohash cell in step with latitude/longitude."""
+    if target.latitude is None or target.longitude is None:
+        target.geohash = None
+    else:
+        target.geohash = geohash_encode(target.latitude, target.longitude)
 
 
+for _model in (Post, ServiceRequest, ServiceOffer):
+    event.listen(_model, 'before_insert', _set_geohash)
+    event.listen(_model, 'before_update', _set_geohash)
@@ -1,8 +1,8 @@
 from flask import Blueprint, request, jsonify, current_app
-from werkzeug.security import check_password_hash
 from app.models import User
-from app.extensions import db
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from app.extensions import db, hasher, blocklist
+from app.utils.security import HasherBusy
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt, current_user
 from datetime import timedelta
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/auth")
@@ -22,7 +22,7 @@ def _verify_password(user, password):
         except TypeError:
             pass
     # fallback: assume user.password stores a hash
-    return check_password_hash(getattr(user, "password", "") or "", password)
+    return hasher.verify(password, getattr(user, "password", "") or "")[0]
 
 @auth_bp.route('/register', methods=['POST'])
 def register():
@@ -39,7 +39,10 @@ def register():
         return jsonify({"message": "User already exists", "id": existing.id}), 200
 
     user = User(username=username, email=email)
-    user.password = password  # use property setter to hash
+    try:
+        user.password = password  # use property setter to hash
+    except HasherBusy:
+        return jsonify({"error": "Server busy, try again"}), 503
     db.session.add(user)
     db.session.commit()
     return jsonify({"message": "User registered successfully", "id": user.id}), 201
@@ -58,12 +61,33 @@ def login():
     elif email:
         user = User.query.filter_by(email=email).first()
 
-    if not _verify_password(user, password):
+    try:
+        verified = _verify_password(user, password)
+    except HasherBusy:
+        return jsonify({"error": "Server busy, try again"}), 503
+    if not verified:
         return jsonify({"error": "Invalid credentials"}), 401
+    if db.session.is_modified(user):
+        db.session.commit()  # stored hash was upgraded to the current scheme/cost
 
     access_token = create_access_token(identity=str(user.id))
-    payload = {"access_token": access_token}
-    print("DEBUG_LOGIN_RESPONSE", payload, flush=True)
-    current_app.logger.info("login response JSON: %s", payload)
-    return jsonify(payload), 200
+    current_app.logger.debug("login succeeded for user %s", user.id)
+    return jsonify({"access_token": access_token}), 200
 
+
+
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required()
+def logout():
+    """Revoke the presented access token."""
+    token = get_jwt()
+    blocklist.revoke(token["jti"], token["exp"])
+    db.session.commit()
+    return jsonify({"message": "Logged out"}), 200
+
+
+@auth_bp.route('/me', methods=['GET'])
+@jwt_required()
+def me():
+    return jsonify({"id": current_user.id, "username": current_user.username,
+                    "email": current_user.email}), 200
@@ -0,0 +1,85 @@
+from datetime import datetime
+import json
+
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from flask_jwt_extended import jwt_required
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models import Post, ServiceRequest, ServiceOffer
+from app.schemas import plain_row_dict
+
+export_bp = Blueprint('export', __name__)
+
+# rows fetched per round trip; server-side cursors keep memory flat regardless of table size
+EXPORT_BATCH_SIZE = 1000
+
+EXPORTS = {
+    'posts': Post,
+    'requests': ServiceRequest,
+    'offers': ServiceOffer,
+}
+
+
+def _parse_filters(model):
+    """Build WHERE clauses from ?category=&bbox=min_lon,min_lat,max_lon,max_lat&updated_since=."""
+    clauses = []
+    category = request.args.get('category')
+    if category:
+        clauses.append(model.category == category)
+
+    bbox = request.args.get('bbox')
+    if bbox:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in bbox.split(','))
+        clauses += [model.latitude.between(min_lat, max_lat),
+                    model.longitude.between(min_lon, max_lon)]
+
+    updated_since = request.args.get('updated_since')
+    if updated_since:
+        clauses.append(model.updated_at > datetime.fromisoformat(updated_since))
+    return clauses
+
+
+@export_bp.route('/export/<kind>', methods=['GET'])
+@jwt_required()
+def export(kind):
+    """Stream every row of ``kind`` (posts, requests, offers).
+
+    Query params: category, bbox, updated_since (ISO 8601), format=ndjson|json.
+    NDJSON (default) emits one object per line; json emits a single array in chunks.
+    """
+    model = EXPORTS.get(kind)
+    if model is None:
+        return jsonify({'error': f'Unknown export {kind!r}'}), 404
+
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in ('ndjson', 'json'):
+        return jsonify({'error': 'format must be ndjson or json'}), 400
+
+    try:
+        clauses = _parse_filters(model)
+    except ValueError:
+        return jsonify({'error': 'Invalid bbox or updated_since'}), 400
+
+    columns = [c for c in model.__table__.columns if c.name != 'geohash']
+    # tombstones only matter to /sync clients
+    stmt = (select(*columns).where(model.deleted.isnot(True), *clauses).order_by(model.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE))
+
+    def generate():
+        result = db.session.execute(stmt)
+        if fmt == 'json':
+            yield '['
+        first = True
+        for partition in result.partitions():
+            lines = [json.dumps(plain_row_dict(row)) for row in partition]
+            if fmt == 'ndjson':
+                yield '\n'.join(lines) + '\n'
+            else:
+                yield ('' if first else ',') + ','.join(lines)
+            first = False
+        if fmt == 'json':
+            yield ']'
+
+    mimetype = 'application/x-ndjson' if fmt == 'ndjson' else 'application/json'
+    return Response(stream_with_context(generate()), mimetype=mimetype)
@@ -1,7 +1,45 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, Response, current_app, jsonify
+from app.extensions import cache, db_tuning, hasher, limiter, metrics, nplusone, shedder
 
 main_bp = Blueprint('main_bp', __name__)
 
 @main_bp.route('/', methods=['GET'])
 def home():
     return jsonify({"message": "KasiLink API is running"}), 200
+
+
+@main_bp.route('/status/cache', methods=['GET'])
+def cache_status():
+    """Response cache hit/miss/invalidation counters per namespace."""
+    return jsonify(cache.stats()), 200
+
+
+@main_bp.route('/status/pool', methods=['GET'])
+def pool_status():
+    """Connection pool gauges and connect/checkout/checkin/invalidate counters per bind."""
+    return jsonify(db_tuning.stats()), 200
+
+
+@main_bp.route('/status/hashing', methods=['GET'])
+def hashing_status():
+    """Password hash/verify latency, rehash count and the active cost settings."""
+    return jsonify(hasher.stats()), 200
+
+
+@main_bp.route('/status/throttling', methods=['GET'])
+def throttling_status():
+    """In-flight requests, requests shed with 503 and requests rejected with 429."""
+    return jsonify(dict(shedder.stats(), rate_limited=limiter.stats()["rejected"])), 200
+
+
+@main_bp.route('/status/nplusone', methods=['GET'])
+def nplusone_status():
+    """Endpoints flagged for N+1 query patterns (development mode only)."""
+    return jsonify({"enabled": current_app.config["N_PLUS_ONE_DETECTION"],
+                    "flagged": nplusone.flagged()}), 200
+
+
+@main_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Request latency, SQL, serialization and geo-candidate metrics in Prometheus text format."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
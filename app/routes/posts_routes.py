@@ -1,26 +1,72 @@
-from flask import Blueprint, request, jsonify
-from math import radians, cos, sin, asin, sqrt
+import heapq
+from datetime import datetime
+
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import joinedload, selectinload
 from app.models import Post
-from app.extensions import db
+from app.extensions import db, spatial, cache, metrics
+from app.utils.geo import bounding_box, radius_filter
+from app.utils.etag import conditional
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.read_replicas import read_only
+from app.utils.spatial_index import fetch_by_ids, geohash_clause
 
 from app.models import Post
-from app.schemas import PostSchema
+from app.schemas import lean_post_dict, lean_post_query, post_schema, posts_schema
 
 posts_bp = Blueprint("posts", __name__, url_prefix="/posts")
 
-def _haversine_km(lat1, lon1, lat2, lon2):
-    if None in (lat1, lon1, lat2, lon2):
-        return None
-    R = 6371.0
-    dlat = radians(lat2 - lat1)
-    dlon = radians(lon2 - lon1)
-    a = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2) ** 2
-    c = 2 * asin(sqrt(a))
-    return R * c
+
+def _post_version(post_id):
+    """(id, updated_at) of one post without loading the row; None if missing or deleted."""
+    row = db.session.execute(select(Post.id, Post.updated_at)
+                             .where(Post.id == post_id, Post.deleted.isnot(True))).first()
+    return tuple(row) if row else None
+
+
+def _posts_version(**kwargs):
+    """Version of the whole post collection for feed/nearby ETags.
+
+    Every write (including soft deletes) bumps ``updated_at``, so its maximum
+    is enough, and is a single seek on ``ix_post_updated_at_id``. Location
+    queries may be answered from this worker's spatial index, so how far it
+    has caught up with the table is part of their version too.
+    """
+    version = db.session.scalar(select(func.max(Post.updated_at)))
+    if "lat" in request.args:
+        return version, spatial.mark(Post, db.session)
+    return version
+
+
+def _dump_with_distances(distances):
+    """Serialize posts for ``{post_id: distance_km}`` in that order, authors eager-loaded."""
+    posts = fetch_by_ids(db.session, Post, list(distances), options=(selectinload(Post.user),))
+    items = []
+    with metrics.timed("schema"):
+        for p in posts:
+            item = post_schema.dump(p)
+            item["distance_km"] = round(distances[p.id], 3)
+            items.append(item)
+    return items
+
+
+def _dump_feed(q, limit, offset=0):
+    """Serialize one page of ``q``, using the lean column path unless disabled in config."""
+    if current_app.config.get("LEAN_LIST_SERIALIZATION", True):
+        rows = lean_post_query(q).offset(offset).limit(limit).all()
+        with metrics.timed("schema"):
+            return [lean_post_dict(row) for row in rows]
+    posts = q.options(selectinload(Post.user)).offset(offset).limit(limit).all()
+    with metrics.timed("schema"):
+        return posts_schema.dump(posts)
 
 
 @posts_bp.route("/", methods=["GET"])
+@read_only
+@conditional(_posts_version)
+@cache.cached("posts")
 def list_posts():
     """
     GET /posts
@@ -29,8 +75,12 @@ def list_posts():
       - lat, lon, radius_km (floats) -> spatial filter (returns distance_km)
       - page (int, default=1) & limit (int, default=20) -> offset/limit pagination
       - Or cursor-based: ?after_id=<last_seen_id>&limit=20 (optional)
+      - lat, lon, nearest (int, max 100) -> the k closest posts (radius_km optional cap)
+      - lat, lon, radius_km, cursor -> keyset pages ordered by (distance, id); pass an
+        empty cursor for the first page, then the returned next_cursor
+      - cursor without lat/lon -> keyset feed pages ordered by (created_at, id) newest first
     """
-    q = Post.query
+    q = Post.query.filter(Post.deleted.isnot(True))
     user_id = request.args.get("user_id", type=int)
     if user_id:
         q = q.filter_by(user_id=user_id)
@@ -48,17 +98,57 @@ def list_posts():
     lon = request.args.get("lon", type=float)
     radius_km = request.args.get("radius_km", type=float)
 
+    nearest = request.args.get("nearest", type=int)
+    if lat is not None and lon is not None and nearest:
+        k = max(1, min(nearest, 100))
+        if user_id:
+            # the grid index is not partitioned by user: rank that user's located posts
+            q = q.filter(Post.latitude.isnot(None), Post.longitude.isnot(None))
+            if radius_km is not None:
+                q = q.filter(geohash_clause(Post.geohash, lat, lon, radius_km))
+            rows = q.with_entities(Post.id, Post.latitude, Post.longitude).all()
+            cap = radius_km if radius_km is not None else float("inf")
+            hits = heapq.nsmallest(k, radius_filter(lat, lon, rows, cap), key=lambda h: (h[1], h[0]))
+        else:
+            # ring search over the grid index, stops once the k closest are known
+            hits = spatial.nearest(Post, lat, lon, k, max_km=radius_km)
+        distances = dict(hits)
+        return jsonify({"nearest": k, "items": _dump_with_distances(distances)}), 200
+
     if lat is not None and lon is not None and radius_km is not None:
         # bounding-box prefilter
-        lat_delta = radius_km / 111.32
-        lon_delta = radius_km / (111.32 * max(0.000001, abs(cos(radians(lat)))))
-
-        min_lat = lat - lat_delta
-        max_lat = lat + lat_delta
-        min_lon = lon - lon_delta
-        max_lon = lon + lon_delta
+        min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+
+        cursor = request.args.get("cursor")
+        if cursor is not None:
+            after = None
+            if cursor:
+                try:
+                    distance, last_id = decode_cursor(cursor, 2)
+                    after = (float(distance), int(last_id))
+                except (TypeError, ValueError):
+                    return jsonify({"error": "Invalid cursor"}), 400
+
+            if user_id:
+                # the grid index is not partitioned by user: rank the bbox candidates
+                q = q.filter(
+                    geohash_clause(Post.geohash, lat, lon, radius_km),
+                    Post.latitude.between(min_lat, max_lat),
+                    Post.longitude.between(min_lon, max_lon),
+                )
+                rows = q.with_entities(Post.id, Post.latitude, Post.longitude).all()
+                keyed = ((round(d, 9), post_id) for post_id, d in radius_filter(lat, lon, rows, radius_km))
+                hits = heapq.nsmallest(limit + 1, (k for k in keyed if after is None or k > after))
+                hits = [(post_id, d) for d, post_id in hits]
+            else:
+                hits = spatial.nearest(Post, lat, lon, limit + 1, max_km=radius_km, after=after)
+
+            next_cursor = encode_cursor(hits[limit - 1][1], hits[limit - 1][0]) if len(hits) > limit else None
+            items = _dump_with_distances(dict(hits[:limit]))
+            return jsonify({"limit": limit, "items": items, "next_cursor": next_cursor}), 200
 
         q = q.filter(
+            geohash_clause(Post.geohash, lat, lon, radius_km),  # indexed cell lookup
             Post.latitude.isnot(None),
             Post.longitude.isnot(None),
             Post.latitude.between(min_lat, max_lat),
@@ -69,20 +159,10 @@ def list_posts():
         if after_id:
             q = q.filter(Post.id > after_id)
 
-        candidates = q.all()  # small result set after bbox; if large, consider SQL limit
-        nearby = []
-        for p in candidates:
-            d = _haversine_km(lat, lon, p.latitude, p.longitude)
-            if d is not None and d <= radius_km:
-                nearby.append((d, p))
-
-        nearby.sort(key=lambda x: x[0])
-        posts_slice = nearby[offset: offset + limit]
-        posts = []
-        for d, p in posts_slice:
-            item = PostSchema().dump(p)
-            item["distance_km"] = round(d, 3)
-            posts.append(item)
+        # rank on coordinates only; full rows are loaded for the requested page alone
+        candidates = q.with_entities(Post.id, Post.latitude, Post.longitude).all()
+        nearby = radius_filter(lat, lon, candidates, radius_km)
+        posts = _dump_with_distances(dict(nearby[offset: offset + limit]))
 
         # metadata for client pagination
         total_matches = len(nearby)
@@ -93,17 +173,35 @@ def list_posts():
             "items": posts
         }), 200
 
+    # Non-spatial keyset path: (created_at, id) descending, served by the composite indexes
+    cursor = request.args.get("cursor")
+    if cursor is not None:
+        q = q.order_by(Post.created_at.desc(), Post.id.desc())
+        if cursor:
+            try:
+                created_at, last_id = decode_cursor(cursor, 2)
+                created_at = datetime.fromisoformat(created_at)
+                last_id = int(last_id)
+            except (TypeError, ValueError):
+                return jsonify({"error": "Invalid cursor"}), 400
+            q = q.filter(tuple_(Post.created_at, Post.id) < (created_at, last_id))
+        items = _dump_feed(q, limit + 1)
+        next_cursor = None
+        if len(items) > limit:
+            last = items[limit - 1]
+            next_cursor = encode_cursor(last["created_at"], last["id"])
+        items = items[:limit]
+        return jsonify({"limit": limit, "items": items, "next_cursor": next_cursor}), 200
+
     # Non-spatial path: use offset/limit at SQL level for performance
     if after_id:
         q = q.filter(Post.id > after_id).order_by(Post.id.asc())
-        posts_objs = q.limit(limit).all()
+        items = _dump_feed(q, limit)
         # cursor-style response (next after_id can be last item's id)
-        next_after = posts_objs[-1].id if posts_objs else None
-        items = PostSchema(many=True).dump(posts_objs)
+        next_after = items[-1]["id"] if items else None
         return jsonify({"after_id": next_after, "limit": limit, "items": items}), 200
 
-    posts_objs = q.order_by(Post.created_at.desc()).offset(offset).limit(limit).all()
-    items = PostSchema(many=True).dump(posts_objs)
+    items = _dump_feed(q.order_by(Post.created_at.desc()), limit, offset)
     return jsonify({
         "page": page,
         "limit": limit,
@@ -112,10 +210,13 @@ def list_posts():
 
 
 @posts_bp.route("/<int:post_id>", methods=["GET"])
+@read_only
+@conditional(_post_version)
+@cache.cached("posts")
 def get_post(post_id):
-    p = Post.query.get_or_404(post_id)
-    schema = PostSchema()
-    return jsonify(schema.dump(p)), 200
+    p = (Post.query.options(joinedload(Post.user))
+         .filter(Post.id == post_id, Post.deleted.isnot(True)).first_or_404())
+    return jsonify(post_schema.dump(p)), 200
 
 @posts_bp.route("/posts", methods=['POST'], strict_slashes=False)
 @posts_bp.route("/", methods=['POST'], strict_slashes=False)
@@ -149,6 +250,7 @@ def create_post():
                     location=location, latitude=latitude, longitude=longitude)
     db.session.add(new_post)
     db.session.commit()
+    cache.invalidate("posts")
 
     return jsonify({"message": "Post created successfully", "id": new_post.id}), 201
 
@@ -160,19 +262,10 @@ def get_posts():
                      "latitude": p.latitude, "longitude": p.longitude} for p in posts]), 200
 
 
-def _haversine_km(lat1, lon1, lat2, lon2):
-    """Return distance between two lat/lon pairs in kilometers."""
-    from math import radians, sin, cos, atan2, sqrt
-
-    R = 6371.0  # Earth radius in km
-    dlat = radians(lat2 - lat1)
-    dlon = radians(lon2 - lon1)
-    a = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2) ** 2
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
-    return R * c
-
-
 @posts_bp.route("/nearby", methods=['GET'], strict_slashes=False)
+@read_only
+@conditional(_posts_version)
+@cache.cached("posts")
 def nearby_posts():
     """Query params: lat, lon, radius_km (default 5km). Returns posts within radius that have coordinates."""
     try:
@@ -186,21 +279,16 @@ def nearby_posts():
     except ValueError:
         return jsonify({"error": "radius_km must be a number"}), 400
 
-    posts = Post.query.filter(Post.latitude.isnot(None), Post.longitude.isnot(None)).all()
-
-    results = []
-    for p in posts:
-        # safety: skip if coordinates missing
-        if p.latitude is None or p.longitude is None:
-            continue
-        dist = _haversine_km(lat, lon, p.latitude, p.longitude)
-        if dist <= radius_km:
-            results.append({"id": p.id, "title": p.title, "content": p.content,
-                            "location": p.location, "latitude": p.latitude,
-                            "longitude": p.longitude, "distance_km": round(dist, 3)})
-
-    # sort by distance
-    results.sort(key=lambda x: x['distance_km'])
+    # only posts in grid cells overlapping the circle are considered
+    candidates = spatial.candidates(Post, lat, lon, radius_km)
+
+    # sorted by distance
+    distances = dict(radius_filter(lat, lon, candidates, radius_km))
+    ordered = list(distances)
+    results = [{"id": p.id, "title": p.title, "content": p.content,
+                "location": p.location, "latitude": p.latitude,
+                "longitude": p.longitude, "distance_km": round(distances[p.id], 3)}
+               for p in fetch_by_ids(db.session, Post, ordered)]
     return jsonify(results), 200
 
 
@@ -216,13 +304,14 @@ def protected_posts():
 @jwt_required()
 def update_post(post_id):
     post = db.session.get(Post, post_id)
-    if not post:
+    if not post or post.deleted:
         return jsonify({"error": "Post not found"}), 404
 
     data = request.get_json()
     post.title = data.get('title', post.title)
     post.content = data.get('content', post.content)
     db.session.commit()
+    cache.invalidate("posts")
 
     return jsonify({"message": "Post updated successfully"}), 200
 
@@ -231,10 +320,12 @@ def update_post(post_id):
 @jwt_required()
 def delete_post(post_id):
     post = db.session.get(Post, post_id)
-    if not post:
+    if not post or post.deleted:
         return jsonify({"error": "Post not found"}), 404
 
-    db.session.delete(post)
+    # keep a tombstone so /sync can tell offline clients about the delete
+    post.deleted = True
     db.session.commit()
+    cache.invalidate("posts")
 
     return jsonify({"message": "Post deleted successfully"}), 200
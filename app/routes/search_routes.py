@@ -0,0 +1,56 @@
+from flask import Blueprint, request, jsonify
+from sqlalchemy.orm import selectinload
+
+from app.extensions import db
+from app.models import Post
+from app.schemas import post_schema
+from app.search import SEARCHABLE, search
+from app.utils.spatial_index import fetch_by_ids
+from app.utils.read_replicas import read_only
+from app.routes.services_routes import _offer_to_dict, _request_to_dict
+
+search_bp = Blueprint('search', __name__)
+
+_SERIALIZERS = {
+    'posts': lambda p, d: dict(post_schema.dump(p), **({'distance_km': round(d, 3)} if d is not None else {})),
+    'requests': _request_to_dict,
+    'offers': _offer_to_dict,
+}
+
+
+@search_bp.route('/search', methods=['GET'])
+@read_only
+def search_view():
+    """Full-text search.
+
+    Query params: q (required), type=posts|requests|offers (default posts),
+    category, lat/lon/radius_km (all three to restrict by distance),
+    page (default 1) and limit (default 20, max 100). Results are ordered by
+    relevance; each item carries ``score`` (higher is better).
+    """
+    q = (request.args.get('q') or '').strip()
+    kind = request.args.get('type', 'posts')
+    if not q:
+        return jsonify({'error': 'q is required'}), 400
+    if kind not in SEARCHABLE:
+        return jsonify({'error': 'type must be one of posts, requests, offers'}), 400
+
+    lat = request.args.get('lat', type=float)
+    lon = request.args.get('lon', type=float)
+    radius_km = request.args.get('radius_km', type=float)
+    near = (lat, lon, radius_km) if None not in (lat, lon, radius_km) else None
+    page = max(1, request.args.get('page', type=int, default=1))
+    limit = max(1, min(request.args.get('limit', type=int, default=20), 100))
+
+    hits, has_more = search(kind, q, category=request.args.get('category'), near=near,
+                            limit=limit, offset=(page - 1) * limit)
+    model = SEARCHABLE[kind][0]
+    options = (selectinload(Post.user),) if model is Post else ()
+    rows = {r.id: r for r in fetch_by_ids(db.session, model, [h[0] for h in hits], options=options)}
+    items = []
+    for row_id, score, distance in hits:
+        if row_id in rows:
+            item = _SERIALIZERS[kind](rows[row_id], distance)
+            item['score'] = round(score, 4)
+            items.append(item)
+    return jsonify({'type': kind, 'page': page, 'limit': limit, 'has_more': has_more, 'items': items}), 200
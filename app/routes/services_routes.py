@@ -1,99 +1,389 @@
-from flask import Blueprint, request, jsonify
+from datetime import datetime
+
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.extensions import db
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from app.extensions import db, spatial, cache
 from app.models import ServiceRequest, ServiceOffer
+from app.scoring import rank_offers
+from app.utils.etag import conditional
+from app.utils.geo import geohash_encode
+from app.utils.read_replicas import read_only
+from app.utils.spatial_index import fetch_by_ids
+from app.matching import (refresh_offer_matches, refresh_request_matches, remove_offer_matches,
+                          remove_request_matches, refresh_matches_for_offers, refresh_matches_for_requests,
+                          match_many, stored_matches, stored_offer_matches)
 
 services_bp = Blueprint('services', __name__)
 
+MAX_BULK_ITEMS = 1000
 
-@services_bp.route('/requests', methods=['POST'])
-@jwt_required()
-def create_request():
-    data = request.get_json() or {}
-    required = ['title', 'description', 'category']
-    for r in required:
-        if r not in data:
-            return jsonify({'error': f'{r} is required'}), 400
+# INSERT .. ON CONFLICT constructs used for bulk upserts
+_UPSERT_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
 
+
+def _service_values(data, price_field):
+    """Validate one request/offer payload; returns ``(column values, error message)``."""
+    if not isinstance(data, dict):
+        return None, 'item must be an object'
+    for r in ('title', 'description', 'category'):
+        if r not in data:
+            return None, f'{r} is required'
     try:
         latitude = float(data.get('latitude')) if data.get('latitude') is not None else None
         longitude = float(data.get('longitude')) if data.get('longitude') is not None else None
         radius_km = float(data.get('radius_km', 10.0))
     except (TypeError, ValueError):
-        return jsonify({'error': 'Invalid latitude/longitude/radius_km'}), 400
+        return None, 'Invalid latitude/longitude/radius_km'
+    try:
+        price = float(data.get(price_field)) if data.get(price_field) is not None else None
+    except (TypeError, ValueError):
+        return None, f'Invalid {price_field}'
+    return {
+        'title': str(data.get('title')),
+        'description': str(data.get('description')),
+        'category': str(data.get('category')),
+        price_field: price,
+        'location': data.get('location'),
+        'latitude': latitude,
+        'longitude': longitude,
+        'radius_km': radius_km,
+    }, None
 
-    user_id = int(get_jwt_identity())
 
-    sr = ServiceRequest(
-        title=str(data.get('title')),
-        description=str(data.get('description')),
-        category=str(data.get('category')),
-        budget=data.get('budget'),
-        location=data.get('location'),
-        latitude=latitude,
-        longitude=longitude,
-        radius_km=radius_km,
-        user_id=user_id
+def _upsert(model, rows):
+    """Update existing rows by primary key with INSERT .. ON CONFLICT DO UPDATE; returns their ids."""
+    stmt = _UPSERT_INSERTS[db.session.get_bind().dialect.name](model)
+    columns = [c for c in rows[0] if c != 'id']
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[model.id],
+        set_={c: stmt.excluded[c] for c in columns} | {'updated_at': datetime.utcnow()},
+        # never touch another user's row, even if it changed hands since the ownership check
+        where=model.user_id == stmt.excluded.user_id,
     )
+    return db.session.scalars(stmt.returning(model.id, sort_by_parameter_order=True), rows).all()
+
+
+def _bulk_insert(model, price_field, refresh_matches):
+    """Validate ``{"items": [...]}`` and write every valid item in one transaction.
+
+    Items without ``id`` are created through a single executemany INSERT ..
+    RETURNING; items with the ``id`` of one of the caller's rows replace that
+    row through one INSERT .. ON CONFLICT DO UPDATE. Both skip the ORM unit of
+    work and its mapper events, so the geohash is computed here and the
+    in-process spatial index is invalidated explicitly.
+    """
+    items = (request.get_json(silent=True) or {}).get('items')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'items must be a non-empty list'}), 400
+    if len(items) > MAX_BULK_ITEMS:
+        return jsonify({'error': f'At most {MAX_BULK_ITEMS} items per call'}), 400
+
+    user_id = int(get_jwt_identity())
+    results = [None] * len(items)
+    new_rows, new_positions, upsert_rows, upsert_positions = [], [], [], []
+    for i, data in enumerate(items):
+        values, error = _service_values(data, price_field)
+        if error is None and data.get('id') is not None:
+            try:
+                values['id'] = int(data['id'])
+            except (TypeError, ValueError):
+                error = 'Invalid id'
+        if error:
+            results[i] = {'index': i, 'error': error}
+            continue
+        values['user_id'] = user_id
+        values['geohash'] = (geohash_encode(values['latitude'], values['longitude'])
+                             if values['latitude'] is not None and values['longitude'] is not None
+                             else None)
+        if 'id' in values:
+            upsert_rows.append(values)
+            upsert_positions.append(i)
+        else:
+            new_rows.append(values)
+            new_positions.append(i)
+
+    if upsert_rows:
+        wanted = {row['id'] for row in upsert_rows}
+        owned = set(db.session.scalars(
+            select(model.id).where(model.id.in_(wanted), model.user_id == user_id,
+                                   model.deleted.isnot(True))))
+        kept = [(i, row) for i, row in zip(upsert_positions, upsert_rows) if row['id'] in owned]
+        for i, row in zip(upsert_positions, upsert_rows):
+            if row['id'] not in owned:
+                results[i] = {'index': i, 'error': f'{model.__name__} {row["id"]} not found'}
+        upsert_positions = [i for i, _ in kept]
+        upsert_rows = [row for _, row in kept]
+
+    created, updated = [], []
+    if new_rows:
+        created = db.session.scalars(
+            insert(model).returning(model.id, sort_by_parameter_order=True), new_rows
+        ).all()
+    if upsert_rows:
+        updated = _upsert(model, upsert_rows)
+    if created or updated:
+        refresh_matches(created + updated)
+        db.session.commit()
+        spatial.invalidate(model)
+        cache.invalidate("matches", "offers")
+    for i, row_id in zip(new_positions, created):
+        results[i] = {'index': i, 'id': row_id}
+    for i, row_id in zip(upsert_positions, updated):
+        results[i] = {'index': i, 'id': row_id, 'updated': True}
+
+    written = len(created) + len(updated)
+    # 201 if anything was created, 200 for updates only, 400 when every item failed
+    status = 201 if created else 200 if updated else 400
+    return jsonify({'created': len(created), 'updated': len(updated),
+                    'failed': len(items) - written, 'results': results}), status
+
+
+def _offer_to_dict(o, distance_km=None):
+    item = {
+        'id': o.id,
+        'title': o.title,
+        'description': o.description,
+        'category': o.category,
+        'hourly_rate': o.hourly_rate,
+        'location': o.location,
+        'latitude': o.latitude,
+        'longitude': o.longitude,
+        'radius_km': o.radius_km,
+        'user_id': o.user_id
+    }
+    if distance_km is not None:
+        item['distance_km'] = round(distance_km, 3)
+    return item
+
+
+@services_bp.route('/requests', methods=['POST'])
+@jwt_required()
+def create_request():
+    values, error = _service_values(request.get_json() or {}, 'budget')
+    if error:
+        return jsonify({'error': error}), 400
+
+    sr = ServiceRequest(user_id=int(get_jwt_identity()), **values)
     db.session.add(sr)
+    db.session.flush()
+    refresh_request_matches(sr)
     db.session.commit()
+    cache.invalidate("matches")
     return jsonify({'message': 'ServiceRequest created', 'id': sr.id}), 201
 
 
+@services_bp.route('/requests/bulk', methods=['POST'])
+@jwt_required()
+def bulk_create_requests():
+    """Body: {"items": [request, ...]} (max 1000); items with an "id" update that request.
+
+    Returns per-item {"index", "id"} or {"index", "error"}; 201 if any request was
+    created, 200 if items only updated, 400 if none was written.
+    """
+    return _bulk_insert(ServiceRequest, 'budget', refresh_matches_for_requests)
+
+
+@services_bp.route('/requests/<int:request_id>', methods=['DELETE'])
+@jwt_required()
+def delete_request(request_id):
+    sr = db.session.get(ServiceRequest, request_id)
+    if not sr or sr.deleted:
+        return jsonify({'error': 'ServiceRequest not found'}), 404
+    if sr.user_id != int(get_jwt_identity()):
+        return jsonify({'error': 'Not allowed'}), 403
+
+    remove_request_matches(sr.id)
+    sr.deleted = True
+    db.session.commit()
+    cache.invalidate("matches")
+    return jsonify({'message': 'ServiceRequest deleted'}), 200
+
+
+def _request_to_dict(r, distance_km=None):
+    item = {
+        'id': r.id,
+        'title': r.title,
+        'description': r.description,
+        'category': r.category,
+        'budget': r.budget,
+        'location': r.location,
+        'latitude': r.latitude,
+        'longitude': r.longitude,
+        'radius_km': r.radius_km,
+        'user_id': r.user_id
+    }
+    if distance_km is not None:
+        item['distance_km'] = round(distance_km, 3)
+    return item
+
+
 @services_bp.route('/offers', methods=['POST'])
 @jwt_required()
 def create_offer():
-    data = request.get_json() or {}
-    required = ['title', 'description', 'category']
-    for r in required:
-        if r not in data:
-            return jsonify({'error': f'{r} is required'}), 400
+    values, error = _service_values(request.get_json() or {}, 'hourly_rate')
+    if error:
+        return jsonify({'error': error}), 400
 
+    so = ServiceOffer(user_id=int(get_jwt_identity()), **values)
+    db.session.add(so)
+    db.session.flush()
+    refresh_offer_matches(so)
+    db.session.commit()
+    cache.invalidate("matches", "offers")
+    return jsonify({'message': 'ServiceOffer created', 'id': so.id}), 201
+
+
+@services_bp.route('/offers/bulk', methods=['POST'])
+@jwt_required()
+def bulk_create_offers():
+    """Body: {"items": [offer, ...]} (max 1000); items with an "id" update that offer.
+
+    Returns per-item {"index", "id"} or {"index", "error"}; 201 if any offer was
+    created, 200 if items only updated, 400 if none was written.
+    """
+    return _bulk_insert(ServiceOffer, 'hourly_rate', refresh_matches_for_offers)
+
+
+@services_bp.route('/offers/nearest', methods=['GET'])
+@read_only
+@cache.cached("offers")
+def nearest_offers():
+    """Query params: lat, lon, category, k (default 20, max 100), radius_km (optional cap)."""
+    lat = request.args.get('lat', type=float)
+    lon = request.args.get('lon', type=float)
+    category = request.args.get('category')
+    if lat is None or lon is None or not category:
+        return jsonify({'error': 'lat, lon and category are required'}), 400
+    k = max(1, min(request.args.get('k', type=int, default=20), 100))
+    radius_km = request.args.get('radius_km', type=float)
+
+    hits = spatial.nearest(ServiceOffer, lat, lon, k, bucket=category, max_km=radius_km)
+    distances = dict(hits)
+    offers = fetch_by_ids(db.session, ServiceOffer, list(distances))
+    return jsonify([_offer_to_dict(o, distances[o.id]) for o in offers]), 200
+
+
+@services_bp.route('/offers/<int:offer_id>', methods=['PUT'])
+@jwt_required()
+def update_offer(offer_id):
+    so = db.session.get(ServiceOffer, offer_id)
+    if not so or so.deleted:
+        return jsonify({'error': 'ServiceOffer not found'}), 404
+    if so.user_id != int(get_jwt_identity()):
+        return jsonify({'error': 'Not allowed'}), 403
+
+    data = request.get_json() or {}
     try:
-        latitude = float(data.get('latitude')) if data.get('latitude') is not None else None
-        longitude = float(data.get('longitude')) if data.get('longitude') is not None else None
-        radius_km = float(data.get('radius_km', 10.0))
+        for field in ('latitude', 'longitude', 'radius_km', 'hourly_rate'):
+            if field in data:
+                setattr(so, field, float(data[field]) if data[field] is not None else None)
     except (TypeError, ValueError):
-        return jsonify({'error': 'Invalid latitude/longitude/radius_km'}), 400
+        return jsonify({'error': 'Invalid latitude/longitude/radius_km/hourly_rate'}), 400
+    for field in ('title', 'description', 'category', 'location'):
+        if field in data:
+            setattr(so, field, data[field] if field == 'location' else str(data[field]))
 
-    user_id = int(get_jwt_identity())
+    db.session.flush()
+    # only requests that can reach the offer's (possibly new) position are re-evaluated
+    refresh_offer_matches(so)
+    db.session.commit()
+    cache.invalidate("matches", "offers")
+    return jsonify({'message': 'ServiceOffer updated'}), 200
 
-    so = ServiceOffer(
-        title=str(data.get('title')),
-        description=str(data.get('description')),
-        category=str(data.get('category')),
-        hourly_rate=data.get('hourly_rate'),
-        location=data.get('location'),
-        latitude=latitude,
-        longitude=longitude,
-        radius_km=radius_km,
-        user_id=user_id
-    )
-    db.session.add(so)
+
+@services_bp.route('/offers/<int:offer_id>', methods=['DELETE'])
+@jwt_required()
+def delete_offer(offer_id):
+    so = db.session.get(ServiceOffer, offer_id)
+    if not so or so.deleted:
+        return jsonify({'error': 'ServiceOffer not found'}), 404
+    if so.user_id != int(get_jwt_identity()):
+        return jsonify({'error': 'Not allowed'}), 403
+
+    # soft delete: the row stays as a tombstone so /sync can tell offline clients
+    remove_offer_matches(so.id)
+    so.deleted = True
     db.session.commit()
-    return jsonify({'message': 'ServiceOffer created', 'id': so.id}), 201
+    cache.invalidate("matches", "offers")
+    return jsonify({'message': 'ServiceOffer deleted'}), 200
 
 
 @services_bp.route('/matches/<int:request_id>', methods=['GET'])
+@read_only
+@conditional()
+@cache.cached("matches")
 def get_matches(request_id):
+    """Stored matches ranked by blended score.
+
+    ?profile=<name> picks the weights (default ``MATCH_SCORING_PROFILE``);
+    ``profile=nearest`` keeps the stored nearest-first order, unscored.
+    """
     sr = db.session.get(ServiceRequest, request_id)
-    if not sr:
+    if not sr or sr.deleted:
         return jsonify({'error': 'ServiceRequest not found'}), 404
 
-    offers = sr.match(session=db.session)
-
-    def _offer_to_dict(o):
-        return {
-            'id': o.id,
-            'title': o.title,
-            'description': o.description,
-            'category': o.category,
-            'hourly_rate': o.hourly_rate,
-            'location': o.location,
-            'latitude': o.latitude,
-            'longitude': o.longitude,
-            'radius_km': o.radius_km,
-            'user_id': o.user_id
-        }
-
-    return jsonify([_offer_to_dict(o) for o in offers]), 200
+    profile = request.args.get('profile') or current_app.config['MATCH_SCORING_PROFILE']
+    try:
+        return jsonify(_ranked_offers(sr, stored_matches(request_id), profile)), 200
+    except KeyError:
+        return jsonify({'error': f'Unknown scoring profile {profile!r}'}), 400
+
+
+def _ranked_offers(sr, matches, profile):
+    """Offer dicts for ``matches`` of ``sr`` under scoring ``profile``; raises KeyError if unknown."""
+    if profile == 'nearest':
+        # distance order is how matches are stored; no need to score
+        return [_offer_to_dict(o, d) for o, d in matches]
+    return [dict(_offer_to_dict(o, d), score=round(s, 4))
+            for o, d, s in rank_offers(sr, matches, profile=profile)]
+
+
+MAX_BATCH_REQUESTS = 500
+
+
+@services_bp.route('/matches/batch', methods=['POST'])
+@read_only
+def get_matches_batch():
+    """Body: {"request_ids": [..], "profile": optional, as for /matches/<id>}.
+
+    Returns {"results": {"<id>": [offers]}, "missing": [ids]}.
+    """
+    data = request.get_json() or {}
+    request_ids = data.get('request_ids')
+    if not isinstance(request_ids, list) or not request_ids:
+        return jsonify({'error': 'request_ids must be a non-empty list'}), 400
+    if len(request_ids) > MAX_BATCH_REQUESTS:
+        return jsonify({'error': f'At most {MAX_BATCH_REQUESTS} request_ids per call'}), 400
+    try:
+        request_ids = [int(r) for r in request_ids]
+    except (TypeError, ValueError):
+        return jsonify({'error': 'request_ids must be integers'}), 400
+
+    profile = data.get('profile') or current_app.config['MATCH_SCORING_PROFILE']
+    results = match_many(request_ids)
+    try:
+        # match_many left the requests in the identity map; get() does not query again
+        ranked = {str(rid): _ranked_offers(db.session.get(ServiceRequest, rid), matches, profile)
+                  for rid, matches in results.items()}
+    except KeyError:
+        return jsonify({'error': f'Unknown scoring profile {profile!r}'}), 400
+    return jsonify({
+        'results': ranked,
+        'missing': [rid for rid in dict.fromkeys(request_ids) if rid not in results]
+    }), 200
+
+
+@services_bp.route('/offers/<int:offer_id>/matches', methods=['GET'])
+@read_only
+@conditional()
+@cache.cached("matches")
+def get_offer_matches(offer_id):
+    """Open requests this offer can serve (within both radii), nearest first."""
+    so = db.session.get(ServiceOffer, offer_id)
+    if not so or so.deleted:
+        return jsonify({'error': 'ServiceOffer not found'}), 404
+
+    matches = stored_offer_matches(so)
+    return jsonify([_request_to_dict(r, d) for r, d in matches]), 200
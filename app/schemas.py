@@ -1,3 +1,4 @@
+from datetime import datetime
 from marshmallow_sqlalchemy import SQLAlchemyAutoSchema
 from marshmallow import Schema, fields
 from app.models import Post, User, ServiceRequest, ServiceOffer
@@ -9,6 +10,7 @@ class PostSchema(SQLAlchemyAutoSchema):
     location = fields.String(required=False)
     latitude = fields.Float(required=False, allow_none=True)
     longitude = fields.Float(required=False, allow_none=True)
+    geohash = fields.String(dump_only=True)
 
     class Meta:
         model = Post
@@ -40,6 +42,7 @@ class ServiceRequestSchema(SQLAlchemyAutoSchema):
     location = fields.String(required=False, allow_none=True)
     latitude = fields.Float(required=False, allow_none=True)
     longitude = fields.Float(required=False, allow_none=True)
+    geohash = fields.String(dump_only=True)
     radius_km = fields.Float(required=False, allow_none=True)
     user_id = fields.Integer(dump_only=True)
 
@@ -58,6 +61,7 @@ class ServiceOfferSchema(SQLAlchemyAutoSchema):
     location = fields.String(required=False, allow_none=True)
     latitude = fields.Float(required=False, allow_none=True)
     longitude = fields.Float(required=False, allow_none=True)
+    geohash = fields.String(dump_only=True)
     radius_km = fields.Float(required=False, allow_none=True)
     user_id = fields.Integer(dump_only=True)
 
@@ -65,4 +69,47 @@ class ServiceOfferSchema(SQLAlchemyAutoSchema):
         model = ServiceOffer
         load_instance = True
         include_fk = True
-        sqla_session = db.session
\ No newline at end of file
+        sqla_session = db.session
+
+
+# Module-level instances: building a schema is far more expensive than dumping with one.
+post_schema = PostSchema()
+posts_schema = PostSchema(many=True)
+
+
+# Lean list serialization: selects exactly the columns PostSchema emits (plus the
+# author's username via a join) and builds dicts directly, skipping ORM identity
+# map work and marshmallow field dispatch. Output is identical to PostSchema.
+POST_LIST_COLUMNS = (
+    Post.id, Post.title, Post.content, Post.user_id, Post.category, Post.location,
+    Post.latitude, Post.longitude, Post.geohash, Post.created_at, Post.updated_at,
+    Post.deleted, User.username,
+)
+
+
+def lean_post_query(query):
+    """Turn a Post query into one returning POST_LIST_COLUMNS rows."""
+    return query.join(Post.user).with_entities(*POST_LIST_COLUMNS)
+
+
+def lean_post_dict(row):
+    return {
+        'id': row.id,
+        'title': row.title,
+        'content': row.content,
+        'user_id': row.user_id,
+        'category': row.category,
+        'location': row.location,
+        'latitude': row.latitude,
+        'longitude': row.longitude,
+        'geohash': row.geohash,
+        'created_at': row.created_at.isoformat() if row.created_at else None,
+        'updated_at': row.updated_at.isoformat() if row.updated_at else None,
+        'deleted': row.deleted,
+        'user': {'username': row.username},
+    }
+
+
+def plain_row_dict(row):
+    """Column row -> JSON-ready dict (datetimes as ISO 8601, like the schemas)."""
+    return {k: v.isoformat() if isinstance(v, datetime) else v for k, v in row._mapping.items()}
@@ -0,0 +1,97 @@
+"""Blended ranking of candidate offers for a ServiceRequest.
+
+Each candidate gets four factors in [0, 1], computed for the whole batch at
+once, and the score is their weighted sum under a named profile from
+``MATCH_SCORING_PROFILES``:
+
+- distance: 1 at the requester's location, falling linearly to 0 at radius_km
+- text: cosine similarity of request and offer title + description words
+- price: budget / hourly_rate capped at 1 (neutral 0.5 when either is unknown)
+- freshness: exponential decay on the offer's last update
+
+Scoring never generates candidates itself; callers pass offers that already
+survived the spatial/category prefilter or come from the match table.
+"""
+import math
+import re
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+from flask import current_app
+
+FACTORS = ('distance', 'text', 'price', 'freshness')
+
+_WORD = re.compile(r'\w{2,}', re.UNICODE)
+
+
+def weight_profile(name=None):
+    """Normalized weight vector (ordered as ``FACTORS``) for profile ``name``.
+
+    Raises KeyError for an unknown profile.
+    """
+    config = current_app.config
+    weights = config['MATCH_SCORING_PROFILES'][name or config['MATCH_SCORING_PROFILE']]
+    w = np.array([float(weights.get(f, 0.0)) for f in FACTORS])
+    total = w.sum()
+    return w / total if total > 0 else np.eye(len(FACTORS))[0]
+
+
+def _words(*texts):
+    return Counter(_WORD.findall(' '.join(t for t in texts if t).lower()))
+
+
+def text_similarity(query, documents):
+    """Cosine similarity of the bag of words of ``query`` against each of ``documents``."""
+    q = _words(query)
+    if not q or not documents:
+        return np.zeros(len(documents))
+    vocab = list(q)
+    q_vec = np.array([q[w] for w in vocab], dtype=np.float64)
+    counts = [_words(d) for d in documents]
+    # only query words contribute to the dot product; document norms use all their words
+    overlap = np.array([[c[w] for w in vocab] for c in counts], dtype=np.float64)
+    norms = np.array([math.sqrt(sum(v * v for v in c.values())) for c in counts])
+    denom = np.linalg.norm(q_vec) * norms
+    return np.divide(overlap @ q_vec, denom, out=np.zeros(len(documents)), where=denom > 0)
+
+
+def factor_matrix(sr, offers, distances, now=None):
+    """``len(offers) x len(FACTORS)`` matrix of per-factor scores."""
+    now = now or datetime.utcnow()
+    distances = np.asarray(distances, dtype=np.float64)
+    radius = sr.radius_km or 0
+    distance = (np.clip(1 - distances / radius, 0, 1) if radius > 0
+                else (distances == 0).astype(np.float64))
+
+    text = text_similarity(f'{sr.title} {sr.description}',
+                           [f'{o.title} {o.description}' for o in offers])
+
+    rates = np.array([o.hourly_rate if o.hourly_rate else np.nan for o in offers], dtype=np.float64)
+    if sr.budget:
+        price = np.where(np.isnan(rates), 0.5, np.clip(sr.budget / rates, 0, 1))
+    else:
+        price = np.full(len(offers), 0.5)
+
+    half_life = current_app.config.get('MATCH_FRESHNESS_HALF_LIFE_DAYS', 30)
+    ages = np.array([((now - (o.updated_at or o.created_at or now)).total_seconds() / 86400)
+                     for o in offers], dtype=np.float64)
+    freshness = np.exp2(-np.maximum(ages, 0) / half_life)
+
+    return np.column_stack([distance, text, price, freshness])
+
+
+def rank_offers(sr, matches, profile=None, now=None):
+    """Order ``[(offer, distance_km), ...]`` by blended score.
+
+    Returns ``[(offer, distance_km, score), ...]``, best first; ties go to the
+    nearer offer, then the lower id.
+    """
+    weights = weight_profile(profile)
+    if not matches:
+        return []
+    offers = [o for o, _ in matches]
+    distances = [d for _, d in matches]
+    scores = factor_matrix(sr, offers, distances, now=now) @ weights
+    order = sorted(range(len(offers)), key=lambda i: (-scores[i], distances[i], offers[i].id))
+    return [(offers[i], distances[i], float(scores[i])) for i in order]
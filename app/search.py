@@ -0,0 +1,121 @@
+"""Full-text search over posts, service requests and service offers.
+
+SQLite keeps an external-content FTS5 table per source table
+(``<table>_fts``, rowid = source id) in step through AFTER INSERT/UPDATE/DELETE
+triggers, so ORM writes, Core bulk inserts and ``flask import-data`` are all
+covered. On Postgres a GIN index on ``to_tsvector`` of the same columns does
+the job and needs no triggers. Both are created by migration and, for
+``db.create_all``, by the DDL hooks below.
+
+Note that ``op.batch_alter_table`` recreates SQLite tables and drops their
+triggers; migrations that batch-alter a searchable table must recreate them.
+"""
+import re
+
+import numpy as np
+from sqlalchemy import DDL, event, column, func, literal_column, select, table
+
+from app.extensions import db
+from app.models import Post, ServiceOffer, ServiceRequest
+from app.utils.geo import haversine_km
+from app.utils.spatial_index import geohash_clause
+
+SEARCHABLE = {
+    'posts': (Post, ('title', 'content')),
+    'requests': (ServiceRequest, ('title', 'description')),
+    'offers': (ServiceOffer, ('title', 'description')),
+}
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_table_name(model):
+    return f'{model.__tablename__}_fts'
+
+
+def sqlite_ddl(source, columns):
+    """CREATE statements for the FTS5 table and sync triggers of ``source``."""
+    fts = f'{source}_fts'
+    cols = ', '.join(columns)
+    new = ', '.join(f'new.{c}' for c in columns)
+    old = ', '.join(f'old.{c}' for c in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content='{source}', content_rowid='id')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {source} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {source} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {source} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END",
+    ]
+
+
+def postgres_document(columns):
+    """The indexed tsvector expression; queries must use the identical expression."""
+    return "to_tsvector('english'::regconfig, " + " || ' ' || ".join(
+        f"coalesce({c}, '')" for c in columns) + ")"
+
+
+for _model, _columns in SEARCHABLE.values():
+    _source = _model.__tablename__
+    for _stmt in sqlite_ddl(_source, _columns):
+        event.listen(_model.__table__, 'after_create', DDL(_stmt).execute_if(dialect='sqlite'))
+    event.listen(_model.__table__, 'before_drop',
+                 DDL(f'DROP TABLE IF EXISTS {_source}_fts').execute_if(dialect='sqlite'))
+    event.listen(_model.__table__, 'after_create', DDL(
+        f'CREATE INDEX IF NOT EXISTS ix_{_source}_fts ON {_source} USING gin ({postgres_document(_columns)})'
+    ).execute_if(dialect='postgresql'))
+
+
+def match_expression(q):
+    """Turn free text into an FTS5 query: every word must match, operators are neutralized."""
+    return ' '.join(f'"{t}"' for t in _TOKEN.findall(q.lower()))
+
+
+def _ranked(model, columns, q, dialect):
+    """Select (id, latitude, longitude, score) for rows matching ``q``, best first."""
+    if dialect == 'postgresql':
+        document = literal_column(postgres_document(columns))
+        query = func.plainto_tsquery(literal_column("'english'::regconfig"), q)
+        score = func.ts_rank(document, query)
+        return (select(model.id, model.latitude, model.longitude, score.label('score'))
+                .where(document.op('@@')(query))
+                .order_by(score.desc(), model.id))
+
+    name = fts_table_name(model)
+    fts = table(name, column('rowid'), column('rank'), column(name))
+    return (select(model.id, model.latitude, model.longitude, (-fts.c.rank).label('score'))
+            .join_from(fts, model, model.id == fts.c.rowid)
+            .where(fts.c[name].op('MATCH')(match_expression(q)))
+            .order_by(fts.c.rank, model.id))
+
+
+def search(kind, q, category=None, near=None, limit=20, offset=0, session=None):
+    """Relevance-ranked ``[(id, score, distance_km or None), ...]`` for one page, plus has_more.
+
+    ``near`` is an optional ``(lat, lon, radius_km)``: the geohash cover narrows
+    candidates in SQL and exact distances are then checked in one vectorized pass.
+    """
+    session = session or db.session
+    model, columns = SEARCHABLE[kind]
+    if not _TOKEN.search(q or ''):
+        return [], False
+
+    stmt = _ranked(model, columns, q, session.get_bind().dialect.name)
+    stmt = stmt.where(model.deleted.isnot(True))
+    if category:
+        stmt = stmt.where(model.category == category)
+
+    if near is None:
+        rows = session.execute(stmt.offset(offset).limit(limit + 1)).all()
+        return [(r.id, float(r.score), None) for r in rows[:limit]], len(rows) > limit
+
+    lat, lon, radius_km = near
+    rows = session.execute(stmt.where(geohash_clause(model.geohash, lat, lon, radius_km))).all()
+    if not rows:
+        return [], False
+    distances = haversine_km(lat, lon, [r.latitude for r in rows], [r.longitude for r in rows])
+    hits = [(rows[i].id, float(rows[i].score), float(distances[i]))
+            for i in np.nonzero(distances <= radius_km)[0]]
+    return hits[offset:offset + limit], len(hits) > offset + limit
@@ -0,0 +1,197 @@
+"""Server-side response cache for hot read endpoints.
+
+Responses are cached per *namespace* (e.g. ``posts``, ``matches``) under a key
+built from the path and the normalized query string. Write handlers call
+``cache.invalidate(namespace)``, which bumps the namespace generation so every
+older entry becomes unreachable at once.
+
+The default backend is an in-process LRU with TTL; each worker has its own,
+so the TTL bounds staleness across processes. ``RedisBackend`` stores entries
+and generations in a shared Redis-compatible server instead (``redis`` is an
+optional dependency, imported only when selected).
+"""
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from functools import wraps
+
+from flask import current_app, g, request
+
+
+class CacheBackend:
+    """Interface for cache storage."""
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        raise NotImplementedError
+
+    def generation(self, namespace):
+        """Current invalidation generation of ``namespace`` (0 if never bumped)."""
+        raise NotImplementedError
+
+    def bump(self, namespace):
+        """Atomically advance the generation of ``namespace``."""
+        raise NotImplementedError
+
+
+class NullBackend(CacheBackend):
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def generation(self, namespace):
+        return 0
+
+    def bump(self, namespace):
+        pass
+
+
+class MemoryBackend(CacheBackend):
+    """Thread-safe LRU with per-entry expiry."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] is not None and entry[0] < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def generation(self, namespace):
+        return self._generations.get(namespace, 0)
+
+    def bump(self, namespace):
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+
+class RedisBackend(CacheBackend):
+    """Shared backend for any Redis-compatible server."""
+
+    def __init__(self, url, prefix="kasilink:cache:"):
+        import redis  # optional dependency
+
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self._client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl):
+        self._client.set(self.prefix + key, json.dumps(value), ex=int(ttl) if ttl else None)
+
+    def generation(self, namespace):
+        return int(self._client.get(self.prefix + "gen:" + namespace) or 0)
+
+    def bump(self, namespace):
+        self._client.incr(self.prefix + "gen:" + namespace)
+
+
+def normalized_query():
+    """The request's query parameters as a canonical, order-independent string."""
+    args = sorted((k, v) for k in request.args for v in request.args.getlist(k))
+    return "&".join(f"{k}={v}" for k, v in args)
+
+
+def _make_backend(config):
+    name = config.get("CACHE_BACKEND", "memory")
+    if name == "memory":
+        return MemoryBackend(config.get("CACHE_MAX_ENTRIES", 1024))
+    if name == "redis":
+        return RedisBackend(config["CACHE_REDIS_URL"])
+    if name == "null":
+        return NullBackend()
+    raise ValueError(f"Unknown CACHE_BACKEND {name!r}")
+
+
+class ResponseCache:
+    """Flask extension: ``@cache.cached('posts')`` on GET views."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("CACHE_BACKEND", "memory")
+        app.config.setdefault("CACHE_DEFAULT_TTL", 30)
+        app.config.setdefault("CACHE_MAX_ENTRIES", 1024)
+        app.extensions["response_cache"] = {
+            "backend": _make_backend(app.config),
+            "stats": defaultdict(lambda: {"hits": 0, "misses": 0, "invalidations": 0}),
+        }
+
+    def _state(self):
+        return current_app.extensions["response_cache"]
+
+    @property
+    def backend(self):
+        return self._state()["backend"]
+
+    @staticmethod
+    def make_key(namespace, generation):
+        key = f"{namespace}:{generation}:{request.path}?{normalized_query()}"
+        # conditional views put the resource version here; keeps bodies per version
+        etag = g.get("etag")
+        return f"{key}#{etag}" if etag else key
+
+    def cached(self, namespace, ttl=None):
+        """Cache successful JSON responses of a GET view under ``namespace``."""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                state = self._state()
+                key = self.make_key(namespace, state["backend"].generation(namespace))
+                hit = state["backend"].get(key)
+                stats = state["stats"][namespace]
+                if hit is not None:
+                    stats["hits"] += 1
+                    return current_app.response_class(hit["body"], status=hit["status"],
+                                                      mimetype="application/json")
+                stats["misses"] += 1
+                rv = current_app.make_response(view(*args, **kwargs))
+                if rv.status_code == 200 and rv.mimetype == "application/json":
+                    state["backend"].set(key, {"body": rv.get_data(as_text=True), "status": 200},
+                                         ttl if ttl is not None else current_app.config["CACHE_DEFAULT_TTL"])
+                return rv
+            return wrapper
+        return decorator
+
+    def invalidate(self, *namespaces):
+        state = self._state()
+        for namespace in namespaces:
+            state["backend"].bump(namespace)
+            state["stats"][namespace]["invalidations"] += 1
+
+    def stats(self):
+        state = self._state()
+        out = {ns: dict(s) for ns, s in state["stats"].items()}
+        for s in out.values():
+            lookups = s["hits"] + s["misses"]
+            s["hit_ratio"] = round(s["hits"] / lookups, 3) if lookups else None
+        return out
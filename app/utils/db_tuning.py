@@ -0,0 +1,74 @@
+"""Engine tuning and connection-pool monitoring.
+
+``SQLITE_PRAGMAS`` are applied to every new DBAPI connection of SQLite
+engines (WAL lets readers proceed while a writer holds the lock; pragmas
+are per connection, so they must be set on connect). Pool events feed
+counters that ``stats()`` reports alongside the pool's own gauges.
+"""
+import threading
+
+from flask import current_app
+from sqlalchemy import event
+
+
+def _apply_pragmas(pragmas):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+    return on_connect
+
+
+class DatabaseTuning:
+    """Flask extension wiring pragmas and pool counters onto Flask-SQLAlchemy engines."""
+
+    def __init__(self, app=None, db=None):
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        app.config.setdefault("SQLITE_PRAGMAS", {})
+        with app.app_context():
+            engines = dict(db.engines)
+
+        counters = {}
+        lock = threading.Lock()
+        for key, engine in engines.items():
+            if engine.dialect.name == "sqlite" and app.config["SQLITE_PRAGMAS"]:
+                event.listen(engine, "connect", _apply_pragmas(app.config["SQLITE_PRAGMAS"]))
+
+            counts = counters[key or "default"] = {
+                "connects": 0, "checkouts": 0, "checkins": 0, "invalidations": 0,
+            }
+            for name, field in (("connect", "connects"), ("checkout", "checkouts"),
+                                ("checkin", "checkins"), ("invalidate", "invalidations")):
+                event.listen(engine, name, self._counter(lock, counts, field))
+
+        app.extensions["db_tuning"] = {"engines": engines, "counters": counters}
+
+    @staticmethod
+    def _counter(lock, counts, field):
+        def listener(*args):
+            with lock:
+                counts[field] += 1
+        return listener
+
+    def stats(self):
+        """Per-bind pool class, gauges (size, checked in/out, overflow) and event counters."""
+        state = current_app.extensions["db_tuning"]
+        out = {}
+        for key, engine in state["engines"].items():
+            name = key or "default"
+            pool = engine.pool
+            item = {"pool": type(pool).__name__, "dialect": engine.dialect.name}
+            for gauge, method in (("size", "size"), ("checked_in", "checkedin"),
+                                  ("checked_out", "checkedout"), ("overflow", "overflow")):
+                fn = getattr(pool, method, None)
+                if callable(fn):
+                    item[gauge] = fn()
+            item.update(state["counters"][name])
+            out[name] = item
+        return out
@@ -0,0 +1,59 @@
+"""Strong ETags and ``If-None-Match`` handling for read endpoints.
+
+``@conditional(version_fn)`` asks ``version_fn`` for a cheap version of the
+resource (e.g. its ``updated_at``) *before* the view runs. If the client
+already has that version the view is skipped entirely and a 304 is returned,
+so neither the full rows nor the schema serialization are touched. Views
+without a cheap version fall back to hashing the response body, which still
+saves the transfer.
+"""
+import hashlib
+from functools import wraps
+
+from flask import current_app, g, make_response, request
+
+from app.utils.cache import normalized_query
+
+
+def make_etag(*parts):
+    raw = "|".join(str(p) for p in parts).encode()
+    return hashlib.sha1(raw).hexdigest()
+
+
+def _not_modified(etag):
+    rv = current_app.response_class(status=304)
+    rv.set_etag(etag)
+    return rv
+
+
+def conditional(version_fn=None):
+    """Add a strong ETag to 200 responses and answer matching If-None-Match with 304.
+
+    ``version_fn`` receives the view arguments and returns a hashable version,
+    or ``None`` when the resource does not exist (the view then runs and
+    produces its own error response).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = None
+            if version_fn is not None:
+                version = version_fn(*args, **kwargs)
+                if version is None:
+                    return view(*args, **kwargs)
+                etag = make_etag(request.path, normalized_query(), version)
+                if etag in request.if_none_match:
+                    return _not_modified(etag)
+                g.etag = etag
+
+            rv = make_response(view(*args, **kwargs))
+            if rv.status_code != 200:
+                return rv
+            if etag is None:
+                etag = hashlib.sha1(rv.get_data()).hexdigest()
+                if etag in request.if_none_match:
+                    return _not_modified(etag)
+            rv.set_etag(etag)
+            return rv
+        return wrapper
+    return decorator
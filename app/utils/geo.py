@@ -0,0 +1,141 @@
+"""Shared geo helpers: vectorized Haversine distances and bounding boxes.
+
+All radius queries compute distances for a whole candidate batch at once
+instead of calling a scalar Haversine per row.
+"""
+from math import cos, degrees, radians
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def bounding_box(lat, lon, radius_km):
+    """Return (min_lat, max_lat, min_lon, max_lon) enclosing the search circle.
+
+    The longitude half-width is measured at the circle's poleward edge, where
+    meridians are closest; a circle reaching a pole spans -180..180.
+    """
+    lat_delta = degrees(radius_km / EARTH_RADIUS_KM)  # same sphere as haversine_km
+    poleward = abs(lat) + lat_delta
+    if poleward >= 90.0:
+        return lat - lat_delta, lat + lat_delta, -180.0, 180.0
+    lon_delta = lat_delta / cos(radians(poleward))
+    return lat - lat_delta, lat + lat_delta, lon - lon_delta, lon + lon_delta
+
+
+def haversine_km(lat, lon, lats, lons):
+    """Distances in km from (lat, lon) to every point of ``lats``/``lons``.
+
+    ``lats``/``lons`` are array-likes of equal length; returns a float64 array.
+    """
+    lat1 = np.radians(lat)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    dlat = lat2 - lat1
+    dlon = np.radians(np.asarray(lons, dtype=np.float64) - lon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def pairwise_haversine_km(lats1, lons1, lats2, lons2):
+    """Distance matrix in km, shape ``(len(lats1), len(lats2))``."""
+    lat1 = np.radians(np.asarray(lats1, dtype=np.float64))[:, None]
+    lon1 = np.radians(np.asarray(lons1, dtype=np.float64))[:, None]
+    lat2 = np.radians(np.asarray(lats2, dtype=np.float64))[None, :]
+    lon2 = np.radians(np.asarray(lons2, dtype=np.float64))[None, :]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def within_radius(lat, lon, lats, lons, radius_km):
+    """Return ``(distances, mask)`` where ``mask`` marks points within ``radius_km``."""
+    distances = haversine_km(lat, lon, lats, lons)
+    return distances, distances <= radius_km
+
+
+def radius_filter(lat, lon, points, radius_km):
+    """Filter ``[(key, lat, lon), ...]`` to those within ``radius_km``.
+
+    Returns ``[(key, distance_km), ...]`` sorted by distance.
+    """
+    if not points:
+        return []
+    keys, lats, lons = zip(*points)
+    distances, mask = within_radius(lat, lon, lats, lons, radius_km)
+    idx = np.flatnonzero(mask)
+    idx = idx[np.argsort(distances[idx], kind="stable")]
+    return [(keys[i], float(distances[i])) for i in idx]
+
+
+# -- geohash ---------------------------------------------------------------
+
+GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9  # ~4.8m x 4.8m, what gets stored on rows
+
+
+def geohash_encode(lat, lon, precision=GEOHASH_PRECISION):
+    """Encode a coordinate as a base32 geohash string."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    chars = []
+    bits = 0
+    n_bits = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if lon >= mid:
+                bits = (bits << 1) | 1
+                lon_lo = mid
+            else:
+                bits <<= 1
+                lon_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                bits = (bits << 1) | 1
+                lat_lo = mid
+            else:
+                bits <<= 1
+                lat_hi = mid
+        even = not even
+        n_bits += 1
+        if n_bits == 5:
+            chars.append(GEOHASH_BASE32[bits])
+            bits = 0
+            n_bits = 0
+    return "".join(chars)
+
+
+def geohash_cell_size(precision):
+    """Return (lat_deg, lon_deg) spanned by one geohash cell at ``precision``."""
+    n = 5 * precision
+    return 180.0 / 2 ** (n // 2), 360.0 / 2 ** ((n + 1) // 2)
+
+
+def geohash_cover(lat, lon, radius_km, max_cells=32):
+    """Return geohash prefixes whose cells together cover the search circle.
+
+    Picks the finest precision that needs at most ``max_cells`` prefixes, so
+    the resulting prefix ranges stay few while still being selective.
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    min_lat, max_lat = max(min_lat, -90.0), min(max_lat, 89.999999)
+    if max_lon - min_lon >= 360.0:
+        min_lon, max_lon = -180.0, 179.999999
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_step, lon_step = geohash_cell_size(precision)
+        n_lat = int(max_lat // lat_step) - int(min_lat // lat_step) + 1
+        n_lon = int(max_lon // lon_step) - int(min_lon // lon_step) + 1
+        if n_lat * n_lon <= max_cells or precision == 1:
+            break
+    cells = set()
+    for i in range(n_lat):
+        cell_lat = min(min_lat + i * lat_step, max_lat)
+        for j in range(n_lon):
+            cell_lon = min_lon + j * lon_step
+            cell_lon = min(cell_lon, max_lon)
+            # wrap across the antimeridian
+            cell_lon = (cell_lon + 180.0) % 360.0 - 180.0
+            cells.add(geohash_encode(cell_lat, cell_lon, precision))
+    return sorted(cells)
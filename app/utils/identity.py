@@ -0,0 +1,169 @@
+"""JWT identity cache and token revocation.
+
+``UserCache`` backs ``flask_jwt_extended``'s ``user_lookup_loader``, which
+already runs once per request (``current_user`` is memoized for the request);
+across requests users come from a per-process snapshot cache with a short TTL (``JWT_USER_CACHE_TTL``).
+Snapshots are re-attached to the session with ``merge(load=False)``, so a
+cache hit costs no query. Committed updates or deletes of a User drop its
+snapshot in this process; other workers see the change within the TTL.
+
+``TokenBlocklist`` backs ``token_in_blocklist_loader``. Revoked JWT ids are
+persisted in ``revoked_token`` (so every worker learns about them) and
+mirrored per process in a ``{jti: expires_at}`` dict. The table is read at
+most every ``JWT_BLOCKLIST_SYNC_SECONDS``, never once per request. Each sync
+re-reads unexpired rows created since the previous sync minus
+``JWT_BLOCKLIST_SYNC_OVERLAP_SECONDS``. Reading by time rather than by id
+means a revocation whose transaction commits late (Postgres sequence values
+commit out of order) is still picked up. Expired jtis are dropped from the
+dict, since expired tokens are rejected before the blocklist is consulted.
+"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app, has_app_context
+from sqlalchemy import delete, event, inspect, select
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+
+class UserCache:
+    """Flask extension resolving JWT identities to User rows through a short TTL cache."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("JWT_USER_CACHE_TTL", 60)
+        app.extensions["user_cache"] = {
+            "entries": {},  # user_id -> (expires_at, column snapshot)
+            "lock": threading.Lock(),
+            "stats": {"hits": 0, "misses": 0, "invalidations": 0},
+        }
+
+    def _state(self):
+        return current_app.extensions["user_cache"]
+
+    def load(self, user_id):
+        """The User for ``user_id`` attached to the current session, or None."""
+        from app.extensions import db
+        from app.models import User
+
+        user_id = int(user_id)
+        state = self._state()
+        entry = state["entries"].get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            state["stats"]["hits"] += 1
+            user = User(**entry[1])
+            make_transient_to_detached(user)
+            user = db.session.merge(user, load=False)
+        else:
+            state["stats"]["misses"] += 1
+            user = db.session.get(User, user_id)
+            if user is not None:
+                snapshot = {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+                ttl = current_app.config["JWT_USER_CACHE_TTL"]
+                with state["lock"]:
+                    state["entries"][user_id] = (time.monotonic() + ttl, snapshot)
+        return user
+
+    def invalidate(self, *user_ids):
+        state = self._state()
+        with state["lock"]:
+            for user_id in user_ids:
+                if state["entries"].pop(user_id, None) is not None:
+                    state["stats"]["invalidations"] += 1
+
+    def stats(self):
+        state = self._state()
+        return dict(state["stats"], size=len(state["entries"]))
+
+
+class TokenBlocklist:
+    """Flask extension: ``revoke(jti, expires_at)`` and ``is_revoked(jti)``."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("JWT_BLOCKLIST_SYNC_SECONDS", 5)
+        app.config.setdefault("JWT_BLOCKLIST_SYNC_OVERLAP_SECONDS", 60)
+        app.extensions["token_blocklist"] = {
+            "revoked": {},  # jti -> expires_at (naive UTC)
+            "synced_at": None,  # monotonic time of the last sync
+            "synced_since": None,  # wall-clock start of the last sync
+            "lock": threading.Lock(),
+        }
+
+    def _state(self):
+        return current_app.extensions["token_blocklist"]
+
+    def _sync(self, state):
+        """Pull recent revocations made by any worker and forget expired ones."""
+        from app.extensions import db
+        from app.models import RevokedToken
+
+        now = time.monotonic()
+        config = current_app.config
+        if state["synced_at"] is not None and now - state["synced_at"] < config["JWT_BLOCKLIST_SYNC_SECONDS"]:
+            return
+        started = datetime.utcnow()
+        stmt = select(RevokedToken.jti, RevokedToken.expires_at).where(RevokedToken.expires_at > started)
+        if state["synced_since"] is not None:
+            overlap = timedelta(seconds=config["JWT_BLOCKLIST_SYNC_OVERLAP_SECONDS"])
+            stmt = stmt.where(RevokedToken.created_at >= state["synced_since"] - overlap)
+        rows = db.session.execute(stmt).all()
+        with state["lock"]:
+            state["revoked"].update(rows)
+            state["revoked"] = {jti: exp for jti, exp in state["revoked"].items() if exp > started}
+            state["synced_at"] = now
+            state["synced_since"] = started
+
+    def is_revoked(self, jti):
+        state = self._state()
+        self._sync(state)
+        return jti in state["revoked"]
+
+    def revoke(self, jti, expires_at):
+        """Persist the revocation and apply it to this process immediately (caller commits)."""
+        from app.extensions import db
+        from app.models import RevokedToken
+
+        if isinstance(expires_at, (int, float)):
+            expires_at = datetime.fromtimestamp(expires_at, timezone.utc).replace(tzinfo=None)
+        # expired tokens are rejected before the blocklist is consulted; keep the table small
+        db.session.execute(delete(RevokedToken).where(RevokedToken.expires_at < datetime.utcnow()))
+        db.session.add(RevokedToken(jti=jti, expires_at=expires_at))
+        state = self._state()
+        with state["lock"]:
+            state["revoked"][jti] = expires_at
+
+
+# -- drop cached identities when a User row changes ---------------------------
+
+def _user_ids(objects):
+    from app.models import User
+
+    return [obj.id for obj in objects if isinstance(obj, User) and obj.id is not None]
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_user_changes(session, flush_context):
+    changed = _user_ids(session.dirty) + _user_ids(session.deleted)
+    if changed:
+        session.info.setdefault("identity_pending", set()).update(changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_user_changes(session):
+    pending = session.info.pop("identity_pending", None)
+    if pending and has_app_context() and "user_cache" in current_app.extensions:
+        from app.extensions import user_cache
+
+        user_cache.invalidate(*pending)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_user_changes(session, previous_transaction):
+    session.info.pop("identity_pending", None)
@@ -0,0 +1,197 @@
+"""Request metrics in the Prometheus text format.
+
+``Metrics`` times every request per endpoint, counts SQL statements and their
+time per request through engine cursor events, and exposes helpers for
+serialization time (``metrics.timed("schema")``; JSON encoding is timed by
+the app's JSON provider) and spatial candidate counts. ``render()`` produces
+the body served at ``/metrics``. Values are per process, like any Prometheus
+client without a multiprocess collector: scrape each worker.
+
+With ``PROFILE_SLOW_REQUEST_MS`` set, a ``SamplingProfiler`` additionally
+samples request stacks and writes collapsed stacks for slow requests (see
+``app/utils/profiler.py``).
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, has_app_context, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+
+from app.utils.profiler import SamplingProfiler
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+CANDIDATE_BUCKETS = (0, 10, 100, 1000, 10_000, 100_000, 1_000_000)
+
+
+def _labels(names, values):
+    return ",".join(f'{n}="{str(v)}"' for n, v in zip(names, values))
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames, buckets):
+        self.name, self.help, self.labelnames, self.buckets = name, help, labelnames, buckets
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.setdefault(labels, [0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted(self._series.items())
+        for labels, series in items:
+            base = _labels(self.labelnames, labels)
+            sep = "," if base else ""
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{base}}} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help, labelnames):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{{{_labels(self.labelnames, labels)}}} {value:g}")
+        return lines
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON provider that reports encoding time as serialization stage ``json``."""
+
+    def dumps(self, obj, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            if "metrics" in self._app.extensions:
+                self._app.extensions["metrics"]["serialization"].observe(
+                    time.perf_counter() - started, "json")
+
+
+class Metrics:
+    """Flask extension collecting request, SQL, serialization and geo metrics."""
+
+    def __init__(self, app=None, db=None):
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        app.config.setdefault("METRICS_ENABLED", True)
+        app.config.setdefault("PROFILE_SLOW_REQUEST_MS", 0)
+        state = app.extensions["metrics"] = {
+            "requests": Counter("kasilink_requests_total", "Requests by endpoint, method and status.",
+                                ("endpoint", "method", "status")),
+            "latency": Histogram("kasilink_request_duration_seconds", "Request latency by endpoint.",
+                                 ("endpoint", "method"), LATENCY_BUCKETS),
+            "sql_count": Histogram("kasilink_sql_queries_per_request", "SQL statements per request.",
+                                   ("endpoint",), QUERY_COUNT_BUCKETS),
+            "sql_seconds": Counter("kasilink_sql_seconds_total", "Time spent in SQL statements.",
+                                   ("endpoint",)),
+            "serialization": Histogram("kasilink_serialization_seconds",
+                                       "Time spent serializing responses, by stage.",
+                                       ("stage",), LATENCY_BUCKETS),
+            "candidates": Histogram("kasilink_geo_candidates", "Spatial candidates examined per lookup.",
+                                    ("model",), CANDIDATE_BUCKETS),
+            "profiler": None,
+        }
+        if app.config["PROFILE_SLOW_REQUEST_MS"]:
+            state["profiler"] = SamplingProfiler(
+                interval=app.config.get("PROFILE_SAMPLE_INTERVAL_MS", 5) / 1000,
+                output_dir=app.config.get("PROFILE_OUTPUT_DIR") or app.instance_path + "/profiles",
+            )
+        if not app.config["METRICS_ENABLED"]:
+            return
+
+        app.json = TimedJSONProvider(app)
+        with app.app_context():
+            engines = list(db.engines.values())
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    def _state(self):
+        return current_app.extensions["metrics"]
+
+    def _start(self):
+        request.environ["kasilink.metrics"] = {"started": time.perf_counter(), "queries": 0, "sql": 0.0}
+        profiler = self._state()["profiler"]
+        if profiler is not None:
+            profiler.begin()
+
+    def _finish(self, response):
+        stats = request.environ.pop("kasilink.metrics", None)
+        if stats is None:
+            return response
+        state = self._state()
+        elapsed = time.perf_counter() - stats["started"]
+        endpoint = request.endpoint or "unmatched"
+        state["requests"].inc(1, endpoint, request.method, response.status_code)
+        state["latency"].observe(elapsed, endpoint, request.method)
+        state["sql_count"].observe(stats["queries"], endpoint)
+        state["sql_seconds"].inc(stats["sql"], endpoint)
+        profiler = state["profiler"]
+        if profiler is not None:
+            slow = elapsed * 1000 >= current_app.config["PROFILE_SLOW_REQUEST_MS"]
+            profiler.end(f"{request.method} {endpoint}" if slow else None)
+        return response
+
+    @contextmanager
+    def timed(self, stage):
+        """Record the duration of the block as serialization ``stage``."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            if current_app.config["METRICS_ENABLED"]:
+                self._state()["serialization"].observe(time.perf_counter() - started, stage)
+
+    def observe_candidates(self, model_name, count):
+        """Record how many spatial candidates a lookup had to check exactly."""
+        if has_app_context() and current_app.config.get("METRICS_ENABLED"):
+            self._state()["candidates"].observe(count, model_name)
+
+    def render(self):
+        state = self._state()
+        lines = []
+        for key in ("requests", "latency", "sql_count", "sql_seconds", "serialization", "candidates"):
+            lines.extend(state[key].render())
+        return "\n".join(lines) + "\n"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("kasilink.query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["kasilink.query_start"].pop()
+    if has_request_context():
+        stats = request.environ.get("kasilink.metrics")
+        if stats is not None:
+            stats["queries"] += 1
+            stats["sql"] += time.perf_counter() - started
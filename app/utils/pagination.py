@@ -0,0 +1,25 @@
+"""Opaque keyset cursors.
+
+A cursor is the sort key of the last item on a page, JSON-encoded and
+base64url-wrapped so clients treat it as an opaque token.
+"""
+import base64
+import binascii
+import json
+
+
+def encode_cursor(*values):
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(token, size):
+    """Return the ``size`` values stored in ``token``; raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ValueError("invalid cursor") from exc
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("invalid cursor")
+    return values
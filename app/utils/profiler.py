@@ -0,0 +1,67 @@
+"""Opt-in sampling profiler for slow requests.
+
+One daemon thread samples the Python stacks of the threads currently serving
+a request every ``interval`` seconds (``sys._current_frames``; no tracing
+overhead in the request itself). When a request turns out to be slow its
+samples are written as collapsed stacks (``frame;frame;frame count``, one
+per line), the input format of ``flamegraph.pl`` and speedscope. Fast
+requests' samples are discarded.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+def _collapse(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    def __init__(self, interval=0.005, output_dir="profiles"):
+        self.interval = interval
+        self.output_dir = output_dir
+        self._active = {}  # thread id -> Counter of collapsed stacks
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="request-sampler", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, samples in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[_collapse(frame)] += 1
+
+    def begin(self):
+        """Start sampling the calling thread."""
+        with self._lock:
+            self._active[threading.get_ident()] = Counter()
+            self._ensure_thread()
+
+    def end(self, label=None):
+        """Stop sampling the calling thread; with a ``label`` write its stacks. Returns the path or None."""
+        with self._lock:
+            samples = self._active.pop(threading.get_ident(), None)
+        if not label or not samples:
+            return None
+        os.makedirs(self.output_dir, exist_ok=True)
+        safe = "".join(c if c.isalnum() or c in "._-" else "_" for c in label)
+        path = os.path.join(self.output_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{safe}-{os.getpid()}.folded")
+        with open(path, "a") as fh:
+            for stack, count in samples.most_common():
+                fh.write(f"{stack} {count}\n")
+        return path
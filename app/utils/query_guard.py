@@ -0,0 +1,157 @@
+"""N+1 query detection.
+
+``QueryCounter`` records the SQL statements executed on a set of engines
+while it is active; tests use it through the ``count_queries`` fixture to
+assert that an endpoint's query count does not depend on how many rows it
+returns.
+
+``NPlusOneDetector`` is the development-mode counterpart
+(``N_PLUS_ONE_DETECTION``). It counts statements per request and flags an
+endpoint when
+
+* one statement is executed ``N_PLUS_ONE_REPEAT_THRESHOLD`` times or more in
+  a single request (a lazy relationship loaded row by row), or
+* across requests its query count grows by at least one per extra result row
+  over a spread of ``N_PLUS_ONE_MIN_ROWS`` rows or more.
+
+Flags are logged once per endpoint and reason and listed at
+``/status/nplusone``; every response also carries ``X-Query-Count``. The
+detector parses JSON responses to size them, so it is meant for development
+only.
+"""
+import threading
+from collections import Counter
+
+from flask import current_app, has_request_context, request
+from sqlalchemy import event
+
+
+class QueryCounter:
+    """Context manager collecting statements executed on ``engines``."""
+
+    def __init__(self, engines):
+        self.engines = list(engines)
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        self.statements = []
+        for engine in self.engines:
+            event.listen(engine, "after_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        for engine in self.engines:
+            event.remove(engine, "after_cursor_execute", self._record)
+        return False
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def repeated(self, threshold=2):
+        """``{statement: times}`` for statements executed at least ``threshold`` times."""
+        return {s: n for s, n in Counter(self.statements).items() if n >= threshold}
+
+
+def result_size(response):
+    """Rows in a JSON response: the length of a top-level list, else of its longest list value."""
+    if response.direct_passthrough or response.is_streamed or not response.is_json:
+        return None
+    data = response.get_json(silent=True)
+    if isinstance(data, list):
+        return len(data)
+    if isinstance(data, dict):
+        sizes = [len(v) for v in data.values() if isinstance(v, (list, dict))]
+        return max(sizes) if sizes else None
+    return None
+
+
+class NPlusOneDetector:
+    """Flask extension flagging endpoints whose query count scales with their result size."""
+
+    def __init__(self, app=None, db=None):
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        app.config.setdefault("N_PLUS_ONE_DETECTION", False)
+        app.config.setdefault("N_PLUS_ONE_REPEAT_THRESHOLD", 10)
+        app.config.setdefault("N_PLUS_ONE_MIN_ROWS", 3)
+        app.extensions["nplusone"] = {
+            "samples": {},  # endpoint -> {result size: fewest queries seen}
+            "flagged": {},  # (endpoint, reason) -> details
+            "lock": threading.Lock(),
+        }
+        if not app.config["N_PLUS_ONE_DETECTION"]:
+            return
+        with app.app_context():
+            engines = list(db.engines.values())
+        for engine in engines:
+            event.listen(engine, "after_cursor_execute", _record_statement)
+        app.before_request(self._start)
+        app.after_request(self._check)
+
+    def _state(self):
+        return current_app.extensions["nplusone"]
+
+    def _start(self):
+        request.environ["kasilink.statements"] = Counter()
+
+    def _check(self, response):
+        statements = request.environ.pop("kasilink.statements", None)
+        if statements is None:
+            return response
+        queries = sum(statements.values())
+        response.headers["X-Query-Count"] = str(queries)
+        endpoint = request.endpoint
+        if endpoint is None or response.status_code != 200:
+            return response
+
+        config = current_app.config
+        statement, times = max(statements.items(), key=lambda kv: kv[1], default=(None, 0))
+        if times >= config["N_PLUS_ONE_REPEAT_THRESHOLD"]:
+            self._flag(endpoint, "repeated", {"statement": statement, "times": times})
+
+        size = result_size(response)
+        if size is None:
+            return response
+        state = self._state()
+        with state["lock"]:
+            samples = state["samples"].setdefault(endpoint, {})
+            samples[size] = min(queries, samples.get(size, queries))
+            lo, hi = min(samples), max(samples)
+        if hi - lo >= config["N_PLUS_ONE_MIN_ROWS"] and samples[hi] - samples[lo] >= hi - lo:
+            self._flag(endpoint, "grows_with_rows", {
+                "rows": [lo, hi], "queries": [samples[lo], samples[hi]],
+            })
+        return response
+
+    def _flag(self, endpoint, reason, details):
+        state = self._state()
+        with state["lock"]:
+            first = (endpoint, reason) not in state["flagged"]
+            state["flagged"][(endpoint, reason)] = details
+        if first:
+            current_app.logger.warning("possible N+1 queries in %s (%s): %s", endpoint, reason, details)
+
+    def flagged(self):
+        state = self._state()
+        with state["lock"]:
+            return [dict(details, endpoint=endpoint, reason=reason)
+                    for (endpoint, reason), details in sorted(state["flagged"].items())]
+
+    def reset(self):
+        state = self._state()
+        with state["lock"]:
+            state["samples"].clear()
+            state["flagged"].clear()
+
+
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        statements = request.environ.get("kasilink.statements")
+        if statements is not None:
+            statements[statement] += 1
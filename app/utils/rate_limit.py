@@ -0,0 +1,197 @@
+"""Request throttling and load shedding.
+
+``RateLimiter`` applies token buckets keyed by JWT identity (or client IP
+for anonymous callers). Rules live in ``RATE_LIMITS``, keyed by endpoint
+(``"auth.login"``) or blueprint (``"search"``) name, as ``"<count>/<second|
+minute|hour>"``: the bucket holds ``count`` tokens and refills at that rate.
+Rejected requests get 429 with ``Retry-After``. Buckets live in process
+memory by default; ``RATE_LIMIT_BACKEND = "redis"`` shares them between
+workers (``redis`` is an optional dependency).
+
+``LoadShedder`` counts in-flight requests per process and answers 503 at
+once when more than ``LOAD_SHED_MAX_IN_FLIGHT`` are running, rather than
+letting work queue up behind saturated workers.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600}
+
+
+def parse_rate(spec):
+    """``"10/minute"`` -> ``(10, 60)``."""
+    count, _, period = spec.partition("/")
+    return int(count), PERIODS[period.strip()]
+
+
+class RateLimitBackend:
+    """Interface for token-bucket storage."""
+
+    def take(self, key, capacity, period):
+        """Take one token; returns ``(allowed, seconds until a token is available)``."""
+        raise NotImplementedError
+
+
+class MemoryBackend(RateLimitBackend):
+    def __init__(self, max_keys=100_000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, period):
+        rate = capacity / period
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+
+class RedisBackend(RateLimitBackend):
+    """Buckets shared by all workers in a Redis-compatible server, updated atomically in Lua."""
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    local allowed = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url, prefix="kasilink:ratelimit:"):
+        import redis  # optional dependency
+
+        self._client = redis.Redis.from_url(url)
+        self._take = self._client.register_script(self.SCRIPT)
+        self.prefix = prefix
+
+    def take(self, key, capacity, period):
+        rate = capacity / period
+        allowed, tokens = self._take(keys=[self.prefix + key], args=[capacity, rate, time.time()])
+        return bool(allowed), 0 if allowed else (1 - float(tokens)) / rate
+
+
+def _make_backend(config):
+    name = config.get("RATE_LIMIT_BACKEND", "memory")
+    if name == "memory":
+        return MemoryBackend()
+    if name == "redis":
+        return RedisBackend(config["RATE_LIMIT_REDIS_URL"])
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND {name!r}")
+
+
+def client_key():
+    """JWT identity when a valid token is presented, else the client address."""
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:  # expired/invalid tokens are rejected later by the view itself
+        identity = None
+    return f"user:{identity}" if identity is not None else f"ip:{request.remote_addr}"
+
+
+class RateLimiter:
+    """Flask extension enforcing ``RATE_LIMITS`` before each request."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("RATE_LIMIT_ENABLED", True)
+        app.config.setdefault("RATE_LIMIT_BACKEND", "memory")
+        app.config.setdefault("RATE_LIMITS", {})
+        app.extensions["rate_limiter"] = {
+            "backend": _make_backend(app.config), "rejected": 0, "lock": threading.Lock(),
+        }
+        app.before_request(self._check)
+
+    def _rule(self):
+        limits = current_app.config["RATE_LIMITS"]
+        for name in (request.endpoint, request.blueprint):
+            if name and name in limits:
+                return name, limits[name]
+        return None, None
+
+    def stats(self):
+        return {"rejected": current_app.extensions["rate_limiter"]["rejected"]}
+
+    def _check(self):
+        if not current_app.config["RATE_LIMIT_ENABLED"]:
+            return None
+        name, spec = self._rule()
+        if spec is None:
+            return None
+        capacity, period = parse_rate(spec)
+        state = current_app.extensions["rate_limiter"]
+        allowed, retry_after = state["backend"].take(f"{name}:{client_key()}", capacity, period)
+        if allowed:
+            return None
+        with state["lock"]:
+            state["rejected"] += 1
+        response = jsonify({"error": "Too many requests"})
+        response.status_code = 429
+        response.headers["Retry-After"] = str(max(1, round(retry_after + 0.5)))
+        return response
+
+
+class LoadShedder:
+    """Flask extension rejecting requests with 503 beyond ``LOAD_SHED_MAX_IN_FLIGHT`` (0 disables)."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("LOAD_SHED_MAX_IN_FLIGHT", 0)
+        # status endpoints must stay reachable while shedding
+        app.config.setdefault("LOAD_SHED_EXEMPT", ("main_bp",))
+        app.extensions["load_shedder"] = {"in_flight": 0, "shed": 0, "lock": threading.Lock()}
+        app.before_request(self._enter)
+        app.teardown_request(self._leave)
+
+    def _enter(self):
+        limit = current_app.config["LOAD_SHED_MAX_IN_FLIGHT"]
+        if not limit or request.blueprint in current_app.config["LOAD_SHED_EXEMPT"]:
+            return None
+        state = current_app.extensions["load_shedder"]
+        with state["lock"]:
+            if state["in_flight"] >= limit:
+                state["shed"] += 1
+                response = jsonify({"error": "Server busy, try again"})
+                response.status_code = 503
+                response.headers["Retry-After"] = "1"
+                return response
+            state["in_flight"] += 1
+        request.environ["kasilink.in_flight"] = True
+        return None
+
+    def _leave(self, exc=None):
+        if request.environ.pop("kasilink.in_flight", False):
+            state = current_app.extensions["load_shedder"]
+            with state["lock"]:
+                state["in_flight"] -= 1
+
+    def stats(self):
+        state = current_app.extensions["load_shedder"]
+        return {"in_flight": state["in_flight"], "shed": state["shed"]}
@@ -0,0 +1,54 @@
+"""Route read-only work to read replicas.
+
+Replicas are ordinary Flask-SQLAlchemy binds listed in
+``SQLALCHEMY_READ_REPLICAS``. Views wrapped in ``@read_only`` (or code inside
+``replica_reads()``) send their SELECTs to one replica, chosen once per
+session so a request sees a single consistent snapshot. Anything that writes
+goes to the primary: flushes and INSERT/UPDATE/DELETE statements always bind
+there, and once a session has written, every later read in the same request
+does too (read-after-write). Without configured replicas everything stays on
+the primary.
+"""
+import random
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app
+from flask_sqlalchemy.session import Session
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.info.get("read_only"):
+            writing = self._flushing or getattr(clause, "is_dml", False)
+            if writing:
+                self.info["wrote"] = True
+            elif not self.info.get("wrote"):
+                replicas = current_app.config.get("SQLALCHEMY_READ_REPLICAS") or ()
+                if replicas:
+                    key = self.info.get("replica")
+                    if key is None:
+                        key = self.info["replica"] = random.choice(list(replicas))
+                    return self._db.engines[key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@contextmanager
+def replica_reads():
+    """Within the block, reads on ``db.session`` may go to a replica."""
+    session = current_app.extensions["sqlalchemy"].session()
+    previous = session.info.get("read_only", False)
+    session.info["read_only"] = True
+    try:
+        yield session
+    finally:
+        session.info["read_only"] = previous
+
+
+def read_only(view):
+    """Serve a view from a read replica when one is configured."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with replica_reads():
+            return view(*args, **kwargs)
+    return wrapper
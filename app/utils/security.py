@@ -1,3 +1,159 @@
+"""Password hashing.
+
+One configurable passlib context hashes every password: ``PASSWORD_HASH_SCHEME``
+picks the algorithm and ``PASSWORD_HASH_ROUNDS`` maps each scheme to its own
+cost parameter (log2 N for scrypt, iterations for pbkdf2_sha256, log2 rounds
+for bcrypt, time cost for argon2), checked against ``MIN_ROUNDS``. Hashes written by the old
+werkzeug helpers still verify and are flagged for rehash, as are hashes whose
+scheme or cost no longer matches the config, so logins migrate them
+transparently.
+
+Hashing is CPU-bound and would hold the GIL of a request worker, so with
+``PASSWORD_HASH_WORKERS > 0`` it runs in a bounded process pool. At most
+``PASSWORD_HASH_MAX_PENDING`` operations may be queued or running; further
+callers get ``HasherBusy`` straight away instead of waiting. ``HasherBusy`` is
+also raised when a pooled operation exceeds ``PASSWORD_HASH_TIMEOUT``; the
+operation keeps its slot until the KDF actually finishes. With 0 workers
+(development/testing) it runs inline.
+"""
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from functools import lru_cache
+
+from flask import current_app
 from passlib.context import CryptContext
+from werkzeug.security import check_password_hash
+
+
+class HasherBusy(RuntimeError):
+    """Too many hash operations are already queued."""
+
+
+# hashes in any of these still verify after PASSWORD_HASH_SCHEME moves on, then get replaced
+KNOWN_SCHEMES = ("scrypt", "pbkdf2_sha256", "argon2", "bcrypt")
+
+# cost per scheme when PASSWORD_HASH_ROUNDS does not name it, and the lowest accepted
+DEFAULT_ROUNDS = {"scrypt": 15, "pbkdf2_sha256": 600_000, "bcrypt": 12, "argon2": 3}
+MIN_ROUNDS = {"scrypt": 14, "pbkdf2_sha256": 100_000, "bcrypt": 10, "argon2": 2}
+
+
+def scheme_rounds(config):
+    """``(scheme, rounds)`` from the config; ValueError for a cost below ``MIN_ROUNDS``."""
+    scheme = config["PASSWORD_HASH_SCHEME"]
+    rounds = config["PASSWORD_HASH_ROUNDS"].get(scheme, DEFAULT_ROUNDS.get(scheme))
+    if rounds is not None and rounds < MIN_ROUNDS.get(scheme, 0):
+        raise ValueError(f"PASSWORD_HASH_ROUNDS for {scheme} must be at least {MIN_ROUNDS[scheme]}")
+    return scheme, rounds
+
+
+@lru_cache(maxsize=4)
+def _context(scheme, rounds):
+    schemes = [scheme] + [s for s in KNOWN_SCHEMES if s != scheme]
+    cost = {f"{scheme}__rounds": rounds} if rounds is not None else {}
+    return CryptContext(schemes=schemes, default=scheme, deprecated="auto", **cost)
+
+
+def _hash(scheme, rounds, password):
+    return _context(scheme, rounds).hash(password)
+
+
+def _verify(scheme, rounds, password, stored):
+    """Returns ``(ok, replacement hash or None)``; runs in pool workers too."""
+    context = _context(scheme, rounds)
+    if context.identify(stored, required=False) is None:
+        # legacy werkzeug format ("scrypt:N:r:p$salt$hex" / "pbkdf2:sha256:...")
+        ok = check_password_hash(stored, password)
+        return ok, (context.hash(password) if ok else None)
+    return context.verify_and_update(password, stored)
+
+
+class PasswordHasher:
+    """Flask extension: ``hasher.hash(pw)``, ``hasher.verify(pw, stored)``."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("PASSWORD_HASH_SCHEME", "scrypt")
+        app.config.setdefault("PASSWORD_HASH_ROUNDS", DEFAULT_ROUNDS)
+        app.config.setdefault("PASSWORD_HASH_WORKERS", 0)
+        app.config.setdefault("PASSWORD_HASH_MAX_PENDING", 64)
+        app.config.setdefault("PASSWORD_HASH_TIMEOUT", 10)
+        scheme_rounds(app.config)  # fail at startup on a too-cheap cost
+        workers = app.config["PASSWORD_HASH_WORKERS"]
+        app.extensions["password_hasher"] = {
+            "workers": workers,
+            "pool": None,
+            "pool_lock": threading.Lock(),
+            "pending": threading.BoundedSemaphore(app.config["PASSWORD_HASH_MAX_PENDING"]),
+            "stats_lock": threading.Lock(),
+            "stats": {op: {"count": 0, "total_ms": 0.0, "max_ms": 0.0} for op in ("hash", "verify")},
+            "rehashes": 0,
+        }
+
+    def _state(self):
+        return current_app.extensions["password_hasher"]
+
+    def _pool(self, state):
+        # created on first use so forking happens after app setup, once per worker process
+        with state["pool_lock"]:
+            if state["pool"] is None:
+                state["pool"] = ProcessPoolExecutor(max_workers=state["workers"])
+            return state["pool"]
+
+    def _run(self, op, fn, *args):
+        state = self._state()
+        config = current_app.config
+        args = scheme_rounds(config) + args
+        started = time.perf_counter()
+        if state["workers"] > 0:
+            if not state["pending"].acquire(blocking=False):
+                raise HasherBusy("password hashing queue is full")
+            try:
+                future = self._pool(state).submit(fn, *args)
+            except BaseException:
+                state["pending"].release()
+                raise
+            # the slot is freed when the KDF is done (or cancelled while queued), not when we give up
+            future.add_done_callback(lambda f: state["pending"].release())
+            try:
+                result = future.result(timeout=config["PASSWORD_HASH_TIMEOUT"])
+            except FutureTimeout:
+                future.cancel()
+                raise HasherBusy("password hashing timed out") from None
+        else:
+            result = fn(*args)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with state["stats_lock"]:
+            stats = state["stats"][op]
+            stats["count"] += 1
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+        return result
+
+    def hash(self, password):
+        return self._run("hash", _hash, password)
+
+    def verify(self, password, stored):
+        """``(ok, new_hash)``; ``new_hash`` is set when ``stored`` should be replaced."""
+        if not stored or not password:
+            return False, None
+        ok, new_hash = self._run("verify", _verify, password, stored)
+        if new_hash:
+            with self._state()["stats_lock"]:
+                self._state()["rehashes"] += 1
+        return ok, new_hash
 
-pwd_context = CryptContext(schemes=["scrypt"], deprecated="auto")
+    def stats(self):
+        state = self._state()
+        with state["stats_lock"]:
+            out = {op: {"count": s["count"], "total_ms": round(s["total_ms"], 2),
+                        "max_ms": round(s["max_ms"], 2),
+                        "avg_ms": round(s["total_ms"] / s["count"], 2) if s["count"] else None}
+                   for op, s in state["stats"].items()}
+            out["rehashes"] = state["rehashes"]
+        out["scheme"], out["rounds"] = scheme_rounds(current_app.config)
+        out["workers"] = state["workers"]
+        return out
@@ -0,0 +1,410 @@
+"""In-process grid index over latitude/longitude for radius queries.
+
+Rows are bucketed into fixed-size lat/lon cells (optionally split further by a
+column such as ``category``) so a radius lookup only visits the cells that
+overlap the search circle instead of every row in the table.
+
+One index per tracked model is kept on the Flask app. It is built lazily from
+the database on first use and then kept in sync with committed inserts,
+updates and deletes through SQLAlchemy session events. Each worker process
+holds its own copy, so writes made elsewhere (other workers, the CLI, Core
+bulk inserts) are picked up by re-reading rows changed since the index's sync
+mark, at most every ``SPATIAL_INDEX_SYNC_SECONDS``. The re-read reaches
+``SPATIAL_INDEX_SYNC_OVERLAP_SECONDS`` behind the mark so a transaction that
+stamped ``updated_at`` before committing is not missed, and any row with a
+higher id than seen so far is read as well. ``SPATIAL_INDEX_TTL`` rebuilds
+the index from scratch as a backstop.
+"""
+import heapq
+import threading
+import time
+from datetime import timedelta
+from math import asin, cos, floor, pi, radians, sin, sqrt
+
+from flask import current_app, has_app_context
+from sqlalchemy import and_, event, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.utils.geo import EARTH_RADIUS_KM, bounding_box, geohash_cover, haversine_km
+
+# model class -> (bucket attribute or None, exclude attribute or None)
+_tracked = {}
+
+
+def track(model, bucket=None, exclude=None):
+    """Keep a grid index for ``model``, optionally partitioned by ``bucket`` column.
+
+    Rows whose ``exclude`` column is true (e.g. soft-deleted tombstones) are
+    left out of the index. ``model`` needs an ``updated_at`` column bumped on
+    every write; it drives the catch-up with other processes' writes.
+    """
+    _tracked[model] = (bucket, exclude)
+
+
+class GridIndex:
+    """Fixed-size lat/lon cells mapping to ``{key: (lat, lon)}``.
+
+    ``cell_deg`` should divide 360 evenly so cells line up across the
+    antimeridian.
+    """
+
+    def __init__(self, cell_deg=0.05):
+        self.cell_deg = cell_deg
+        self.lon_cells = int(round(360.0 / cell_deg))
+        self._cells = {}    # (bucket, lat_cell, lon_cell) -> {key: (lat, lon)}
+        self._entries = {}  # key -> (bucket, lat_cell, lon_cell)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _wrap(self, lon_cell):
+        half = self.lon_cells // 2
+        return (lon_cell + half) % self.lon_cells - half
+
+    def cell_of(self, lat, lon):
+        return int(floor(lat / self.cell_deg)), self._wrap(int(floor(lon / self.cell_deg)))
+
+    def insert(self, key, lat, lon, bucket=None):
+        with self._lock:
+            self.remove(key)
+            cell = (bucket,) + self.cell_of(lat, lon)
+            self._cells.setdefault(cell, {})[key] = (lat, lon)
+            self._entries[key] = cell
+
+    def remove(self, key):
+        with self._lock:
+            cell = self._entries.pop(key, None)
+            if cell is None:
+                return
+            members = self._cells.get(cell)
+            if members is not None:
+                members.pop(key, None)
+                if not members:
+                    del self._cells[cell]
+
+    def clear(self):
+        with self._lock:
+            self._cells.clear()
+            self._entries.clear()
+
+    def _cell_ranges(self, lat, lon, radius_km):
+        min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+        lat_cells = range(int(floor(min_lat / self.cell_deg)), int(floor(max_lat / self.cell_deg)) + 1)
+        lo, hi = int(floor(min_lon / self.cell_deg)), int(floor(max_lon / self.cell_deg))
+        if hi - lo + 1 >= self.lon_cells:
+            lon_cells = None  # circle wraps the whole parallel
+        else:
+            lon_cells = {self._wrap(c) for c in range(lo, hi + 1)}
+        return lat_cells, lon_cells
+
+    def query_radius(self, lat, lon, radius_km, bucket=None):
+        """Return ``[(key, lat, lon), ...]`` for entries in cells touching the circle.
+
+        This is a candidate set: callers still apply the exact distance check.
+        """
+        lat_cells, lon_cells = self._cell_ranges(lat, lon, radius_km)
+        out = []
+        with self._lock:
+            n_visit = len(lat_cells) * (len(lon_cells) if lon_cells is not None else self.lon_cells)
+            if lon_cells is None or n_visit > len(self._cells):
+                # fewer occupied cells than cells under the circle: scan those instead
+                for (b, cx, cy), members in self._cells.items():
+                    if b == bucket and cx in lat_cells and (lon_cells is None or cy in lon_cells):
+                        out.extend((k, la, lo) for k, (la, lo) in members.items())
+                return out
+            for cx in lat_cells:
+                for cy in lon_cells:
+                    members = self._cells.get((bucket, cx, cy))
+                    if members:
+                        out.extend((k, la, lo) for k, (la, lo) in members.items())
+        return out
+
+    def _ring(self, cx, cy, r):
+        """Cells at Chebyshev distance ``r`` from (cx, cy)."""
+        if r == 0:
+            yield cx, cy
+            return
+        for dy in range(-r, r + 1):
+            yield cx - r, self._wrap(cy + dy)
+            yield cx + r, self._wrap(cy + dy)
+        for dx in range(-r + 1, r):
+            yield cx + dx, self._wrap(cy - r)
+            yield cx + dx, self._wrap(cy + r)
+
+    def _ring_lower_bound_km(self, lat, r):
+        """Lower bound on the distance from (lat, .) to anything outside rings 0..r."""
+        span = radians(r * self.cell_deg)
+        lat_bound = EARTH_RADIUS_KM * span
+        max_lat = min(90.0, abs(lat) + (r + 1) * self.cell_deg)
+        cos_factor = sqrt(max(0.0, cos(radians(lat)) * cos(radians(max_lat))))
+        lon_bound = 2 * EARTH_RADIUS_KM * asin(min(1.0, cos_factor * sin(min(span, pi) / 2)))
+        return min(lat_bound, lon_bound)
+
+    def _ring_upper_bound_km(self, r):
+        """Upper bound on the distance to anything inside rings 0..r."""
+        # meridian leg plus parallel leg, each at most (r + 1) cells
+        return 2 * EARTH_RADIUS_KM * radians((r + 1) * self.cell_deg)
+
+    def nearest(self, lat, lon, k, bucket=None, max_km=None, after=None):
+        """Return the ``k`` nearest ``[(key, distance_km), ...]``, nearest first.
+
+        Rings of cells are visited outward from the query cell, keeping the
+        best ``k`` in a bounded heap; the search stops as soon as nothing in
+        an unvisited ring can beat the current k-th distance (or lies beyond
+        ``max_km``). Ties are broken by key, so keys must be numeric ids.
+
+        ``after`` is a ``(distance_km, key)`` keyset position: only entries
+        ordered strictly after it are returned, and rings lying entirely
+        closer than it are skipped, so deep pages cost about as much as the
+        first one. Distances are rounded to 1e-9 km so keyset comparisons are
+        stable between calls.
+        """
+        if k <= 0:
+            return []
+        heap = []  # max-heap on (distance, key) via negation
+
+        def offer(batch):
+            keys, lats, lons = zip(*batch)
+            for key, d in zip(keys, haversine_km(lat, lon, lats, lons).tolist()):
+                d = round(d, 9)
+                if max_km is not None and d > max_km:
+                    continue
+                if after is not None and (d, key) <= after:
+                    continue
+                item = (-d, -key)
+                if len(heap) < k:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+
+        with self._lock:
+            cx, cy = self.cell_of(lat, lon)
+            visited = 0
+            r = 0
+            if after is not None:
+                while self._ring_upper_bound_km(r) < after[0] and 2 * r + 1 < self.lon_cells:
+                    r += 1
+            while True:
+                if visited > len(self._cells) or 2 * r + 1 >= self.lon_cells:
+                    # sparse data or rings wrapping the globe: scan occupied cells instead
+                    heap.clear()
+                    batch = [(key, la, lo) for (b, _, _), members in self._cells.items() if b == bucket
+                             for key, (la, lo) in members.items()]
+                    if batch:
+                        offer(batch)
+                    break
+                batch = []
+                for cell in self._ring(cx, cy, r):
+                    visited += 1
+                    members = self._cells.get((bucket,) + cell)
+                    if members:
+                        batch.extend((key, la, lo) for key, (la, lo) in members.items())
+                if batch:
+                    offer(batch)
+                bound = self._ring_lower_bound_km(lat, r)
+                if len(heap) == k and -heap[0][0] <= bound:
+                    break
+                if max_km is not None and bound > max_km:
+                    break
+                r += 1
+        return [(-neg_key, -neg_d) for neg_d, neg_key in sorted(heap, reverse=True)]
+
+
+class SpatialIndex:
+    """Flask extension holding one ``GridIndex`` per tracked model."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("SPATIAL_INDEX_CELL_DEG", 0.05)
+        app.config.setdefault("SPATIAL_INDEX_TTL", 600)
+        app.config.setdefault("SPATIAL_INDEX_SYNC_SECONDS", 2)
+        app.config.setdefault("SPATIAL_INDEX_SYNC_OVERLAP_SECONDS", 60)
+        app.extensions["spatial_index"] = {"indexes": {}, "lock": threading.Lock()}
+
+    def _state(self):
+        return current_app.extensions["spatial_index"]
+
+    def _entry(self, model, session):
+        state = self._state()
+        config = current_app.config
+        entry = state["indexes"].get(model)
+        if entry is not None and not _due(entry, config):
+            return entry
+        with state["lock"]:
+            entry = state["indexes"].get(model)
+            ttl = config["SPATIAL_INDEX_TTL"]
+            if entry is None or (ttl is not None and time.monotonic() - entry["built_at"] >= ttl):
+                entry = _build(model, session, config["SPATIAL_INDEX_CELL_DEG"])
+                state["indexes"][model] = entry
+            elif _due(entry, config):
+                _sync(entry, model, session, config["SPATIAL_INDEX_SYNC_OVERLAP_SECONDS"])
+            return entry
+
+    def get(self, model, session):
+        """Return the index for ``model``, building it or catching up with the database if due."""
+        return self._entry(model, session)["index"]
+
+    def mark(self, model, session):
+        """``(updated_at, id)`` high-water mark of what the index has read from the database.
+
+        Responses served from the index should include it in their version:
+        two workers with the same table version can still answer differently
+        until both have caught up.
+        """
+        return self._entry(model, session)["mark"]
+
+    def invalidate(self, model=None):
+        """Drop the index for ``model`` (or all) so the next query rebuilds it."""
+        state = self._state()
+        with state["lock"]:
+            if model is None:
+                state["indexes"].clear()
+            else:
+                state["indexes"].pop(model, None)
+
+    def candidates(self, model, lat, lon, radius_km, bucket=None, session=None):
+        from app.extensions import db, metrics
+        index = self.get(model, session or db.session)
+        found = index.query_radius(lat, lon, radius_km, bucket=bucket)
+        metrics.observe_candidates(model.__name__, len(found))
+        return found
+
+    def nearest(self, model, lat, lon, k, bucket=None, max_km=None, after=None, session=None):
+        from app.extensions import db
+        index = self.get(model, session or db.session)
+        return index.nearest(lat, lon, k, bucket=bucket, max_km=max_km, after=after)
+
+
+def _due(entry, config):
+    now = time.monotonic()
+    ttl = config["SPATIAL_INDEX_TTL"]
+    if ttl is not None and now - entry["built_at"] >= ttl:
+        return True
+    return now - entry["synced_at"] >= config["SPATIAL_INDEX_SYNC_SECONDS"]
+
+
+def _build(model, session, cell_deg):
+    # the mark is read first: rows written during the load are re-read by the next sync
+    mark = tuple(session.execute(select(func.max(model.updated_at), func.max(model.id))).one())
+    index = GridIndex(cell_deg)
+    _load(index, model, session)
+    now = time.monotonic()
+    return {"index": index, "mark": mark, "built_at": now, "synced_at": now}
+
+
+def _load(index, model, session):
+    bucket, exclude = _tracked.get(model, (None, None))
+    cols = [model.id, model.latitude, model.longitude]
+    if bucket:
+        cols.append(getattr(model, bucket))
+    stmt = select(*cols).where(model.latitude.isnot(None), model.longitude.isnot(None))
+    if exclude:
+        stmt = stmt.where(getattr(model, exclude).isnot(True))
+    for row in session.execute(stmt):
+        index.insert(row[0], row[1], row[2], bucket=row[3] if bucket else None)
+
+
+def _sync(entry, model, session, overlap):
+    """Apply rows changed since ``entry``'s mark, re-reading ``overlap`` seconds behind it."""
+    bucket, exclude = _tracked.get(model, (None, None))
+    cols = [model.id, model.latitude, model.longitude, model.updated_at]
+    if bucket:
+        cols.append(getattr(model, bucket))
+    if exclude:
+        cols.append(getattr(model, exclude))
+    stmt = select(*cols)
+    since, last_id = entry["mark"]
+    if last_id is not None:
+        changed = [model.id > last_id]
+        if since is not None:
+            changed.append(model.updated_at >= since - timedelta(seconds=overlap))
+        stmt = stmt.where(or_(*changed))
+
+    index = entry["index"]
+    for row in session.execute(stmt):
+        key, lat, lon, stamp = row[:4]
+        if (exclude and row[-1]) or lat is None or lon is None:
+            index.remove(key)
+        else:
+            index.insert(key, lat, lon, bucket=row[4] if bucket else None)
+        if stamp is not None and (since is None or stamp > since):
+            since = stamp
+        if last_id is None or key > last_id:
+            last_id = key
+    entry["mark"] = (since, last_id)
+    entry["synced_at"] = time.monotonic()
+
+
+def geohash_clause(column, lat, lon, radius_km):
+    """SQL filter restricting ``column`` to geohash cells covering the circle.
+
+    Each covering prefix becomes a ``>= prefix AND < prefix~`` range, which is
+    an index range scan on SQLite and Postgres alike (unlike ``LIKE``).
+    """
+    return geohash_prefix_clause(column, geohash_cover(lat, lon, radius_km))
+
+
+def geohash_prefix_clause(column, prefixes):
+    """SQL filter matching ``column`` values starting with any of ``prefixes``."""
+    return or_(*[and_(column >= prefix, column < prefix + "~") for prefix in prefixes])
+
+
+def fetch_by_ids(session, model, ids, chunk_size=500, options=()):
+    """Load ``model`` rows for ``ids`` and return them in the same order.
+
+    ``options`` are passed to the select, e.g. ``selectinload(Post.user)``.
+    """
+    found = {}
+    ids = list(ids)
+    for i in range(0, len(ids), chunk_size):
+        chunk = ids[i:i + chunk_size]
+        for obj in session.scalars(select(model).where(model.id.in_(chunk)).options(*options)):
+            found[obj.id] = obj
+    return [found[i] for i in ids if i in found]
+
+
+# -- keep indexes in sync with committed ORM writes --------------------------
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    pending = session.info.setdefault("spatial_pending", [])
+    for obj in session.new | session.dirty:
+        model = type(obj)
+        if model in _tracked:
+            bucket, exclude = _tracked[model]
+            if exclude and getattr(obj, exclude):
+                pending.append((model, obj.id, None, None, None))
+                continue
+            pending.append((model, obj.id, obj.latitude, obj.longitude,
+                            getattr(obj, bucket) if bucket else None))
+    for obj in session.deleted:
+        model = type(obj)
+        if model in _tracked:
+            pending.append((model, obj.id, None, None, None))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_changes(session):
+    pending = session.info.pop("spatial_pending", None)
+    if not pending or not has_app_context():
+        return
+    state = current_app.extensions.get("spatial_index")
+    if state is None:
+        return
+    for model, key, lat, lon, bucket in pending:
+        entry = state["indexes"].get(model)
+        if entry is None:
+            continue  # not built yet; will load from the database
+        if lat is None or lon is None:
+            entry["index"].remove(key)
+        else:
+            entry["index"].insert(key, lat, lon, bucket=bucket)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_changes(session, previous_transaction):
+    session.info.pop("spatial_pending", None)
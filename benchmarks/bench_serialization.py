@@ -0,0 +1,70 @@
+"""Compare post list serialization paths on 10k posts.
+
+    python benchmarks/bench_serialization.py [n_posts]
+
+Paths:
+  per-item schema   new PostSchema() per row, lazy ``user`` load per post (old spatial branch)
+  shared + eager    module-level posts_schema with selectinload(Post.user)
+  lean columns      lean_post_query/lean_post_dict straight from selected columns
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import insert, event  # noqa: E402
+from sqlalchemy.orm import selectinload  # noqa: E402
+
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models import Post, User  # noqa: E402
+from app.schemas import PostSchema, lean_post_dict, lean_post_query, posts_schema  # noqa: E402
+from config import TestingConfig  # noqa: E402
+
+
+def _seed(n_posts, n_users=200):
+    db.session.execute(insert(User), [
+        {"username": f"user{i}", "email": f"user{i}@example.com", "_password": "x"}
+        for i in range(n_users)
+    ])
+    db.session.execute(insert(Post), [
+        {"title": f"Post {i}", "content": "Lorem ipsum " * 10, "user_id": i % n_users + 1,
+         "category": "general", "latitude": -26.2 + i * 1e-5, "longitude": 28.0}
+        for i in range(n_posts)
+    ])
+    db.session.commit()
+
+
+def _run(label, fn, queries):
+    db.session.expunge_all()
+    queries[0] = 0
+    start = time.perf_counter()
+    items = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<18} {elapsed * 1000:9.1f} ms  {queries[0]:6d} queries  {len(items)} items")
+    return items
+
+
+def main(n_posts=10_000):
+    app = create_app(TestingConfig)
+    with app.app_context():
+        db.create_all()
+        _seed(n_posts)
+
+        queries = [0]
+
+        @event.listens_for(db.engine, "before_cursor_execute")
+        def _count(*args):
+            queries[0] += 1
+
+        a = _run("per-item schema", lambda: [PostSchema().dump(p) for p in Post.query.all()], queries)
+        b = _run("shared + eager", lambda: posts_schema.dump(
+            Post.query.options(selectinload(Post.user)).all()), queries)
+        c = _run("lean columns", lambda: [lean_post_dict(r) for r in lean_post_query(Post.query)], queries)
+        assert a == b == c, "serialization paths disagree"
+        db.drop_all()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
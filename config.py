@@ -1,9 +1,87 @@
 import os
 
+# read replicas: comma-separated URIs, each registered as bind "replica_<n>"
+_REPLICA_URLS = [u.strip() for u in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+
+
 class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY", "dev_secret_key")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # @read_only views read from these binds (app/utils/read_replicas.py)
+    SQLALCHEMY_BINDS = {f"replica_{i}": url for i, url in enumerate(_REPLICA_URLS)}
+    SQLALCHEMY_READ_REPLICAS = list(SQLALCHEMY_BINDS)
+
+    # response cache for hot GET endpoints: "memory" (per process), "redis" or "null"
+    CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory")
+    CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL")
+    CACHE_DEFAULT_TTL = int(os.environ.get("CACHE_DEFAULT_TTL", 30))
+
+    # build feed items straight from selected columns instead of PostSchema
+    LEAN_LIST_SERIALIZATION = True
+
+    # per-process grid index (app/utils/spatial_index.py): catch up with other processes' writes
+    # at most every SYNC_SECONDS, re-reading OVERLAP seconds behind its mark; full rebuild every TTL
+    SPATIAL_INDEX_SYNC_SECONDS = 2
+    SPATIAL_INDEX_SYNC_OVERLAP_SECONDS = 60
+    SPATIAL_INDEX_TTL = 600
+
+    # blended match ranking (app/scoring.py): weights per factor, normalized to sum to 1
+    MATCH_SCORING_PROFILES = {
+        "nearest": {"distance": 1.0},
+        "balanced": {"distance": 0.45, "text": 0.25, "price": 0.15, "freshness": 0.15},
+    }
+    MATCH_SCORING_PROFILE = "balanced"  # /services/matches without ?profile=; "nearest" skips scoring
+    MATCH_FRESHNESS_HALF_LIFE_DAYS = 30
+
+    # JWT identity cache TTL and how often workers pull revoked tokens (app/utils/identity.py)
+    JWT_USER_CACHE_TTL = 60
+    JWT_BLOCKLIST_SYNC_SECONDS = 5
+    JWT_BLOCKLIST_SYNC_OVERLAP_SECONDS = 60  # longest expected logout transaction plus clock skew
+
+    # /sync hands out rows older than this only: longest expected write transaction plus clock skew
+    SYNC_SAFETY_LAG_SECONDS = 30
+
+    # password hashing (app/utils/security.py); raising rounds rehashes users on their next login
+    PASSWORD_HASH_SCHEME = os.environ.get("PASSWORD_HASH_SCHEME", "scrypt")
+    PASSWORD_HASH_ROUNDS = {  # cost parameter per scheme; see MIN_ROUNDS in app/utils/security.py
+        "scrypt": int(os.environ.get("PASSWORD_HASH_SCRYPT_ROUNDS", 15)),  # log2 N
+        "pbkdf2_sha256": int(os.environ.get("PASSWORD_HASH_PBKDF2_ROUNDS", 600_000)),  # iterations
+        "bcrypt": int(os.environ.get("PASSWORD_HASH_BCRYPT_ROUNDS", 12)),  # log2 rounds
+        "argon2": int(os.environ.get("PASSWORD_HASH_ARGON2_ROUNDS", 3)),  # time cost
+    }
+    PASSWORD_HASH_WORKERS = 0  # 0 hashes inline on the request thread
+
+    # token buckets per endpoint or blueprint name, keyed by JWT identity or IP (app/utils/rate_limit.py)
+    RATE_LIMIT_BACKEND = os.environ.get("RATE_LIMIT_BACKEND", "memory")  # or "redis"
+    RATE_LIMIT_REDIS_URL = os.environ.get("RATE_LIMIT_REDIS_URL")
+    RATE_LIMITS = {
+        "auth.login": "20/minute",
+        "auth.register": "10/minute",
+        "services.get_matches": "120/minute",
+        "services.get_matches_batch": "30/minute",
+        "services.get_offer_matches": "120/minute",
+    }
+    # per-process in-flight requests before answering 503; 0 disables shedding
+    LOAD_SHED_MAX_IN_FLIGHT = int(os.environ.get("LOAD_SHED_MAX_IN_FLIGHT", 0))
+
+    # per-endpoint latency/SQL/serialization metrics served at /metrics (app/utils/metrics.py)
+    METRICS_ENABLED = True
+    # requests slower than this many ms dump collapsed stacks to PROFILE_OUTPUT_DIR; 0 disables sampling
+    PROFILE_SLOW_REQUEST_MS = int(os.environ.get("PROFILE_SLOW_REQUEST_MS", 0))
+    PROFILE_SAMPLE_INTERVAL_MS = 5
+    PROFILE_OUTPUT_DIR = os.environ.get("PROFILE_OUTPUT_DIR")  # default: <instance>/profiles
+
+    # applied to every new SQLite connection (app/utils/db_tuning.py); ignored on other databases
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",      # readers no longer block on the writer
+        "synchronous": "NORMAL",    # safe with WAL, far fewer fsyncs than FULL
+        "busy_timeout": 5000,       # ms to wait for a write lock instead of failing
+        "cache_size": -64000,       # 64 MB page cache per connection
+        "mmap_size": 268435456,     # 256 MB memory-mapped reads
+        "temp_store": "MEMORY",
+    }
+
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -11,6 +89,13 @@ class DevelopmentConfig(Config):
         "DEV_DATABASE_URI",
         "sqlite:///dev.db"  # local development database
     )
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pool_timeout": 10,
+    }
+    # flag endpoints whose query count grows with their result size (app/utils/query_guard.py)
+    N_PLUS_ONE_DETECTION = True
 
 
 class TestingConfig(Config):
@@ -21,3 +106,11 @@ class TestingConfig(Config):
 
 class ProductionConfig(Config):
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL", "sqlite:///prod.db")
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", 10)),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 20)),
+        "pool_timeout": int(os.environ.get("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", 1800)),  # below typical server idle timeouts
+        "pool_pre_ping": True,  # drop connections the server closed while idle
+    }
+    PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))
@@ -0,0 +1,77 @@
+"""geohash cell columns on geo models
+
+Adds a persisted ``geohash`` column to post, service_requests and
+service_offers, indexes it together with ``category`` and backfills existing
+rows in batches.
+
+Revision ID: 3b7c1e9a2d4f
+Revises: fea941b29420
+Create Date: 2026-10-18 12:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.geo import geohash_encode
+
+
+# revision identifiers, used by Alembic.
+revision = '3b7c1e9a2d4f'
+down_revision = 'fea941b29420'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+TABLES = ('post', 'service_requests', 'service_offers')
+
+
+def _backfill(table_name):
+    conn = op.get_bind()
+    table = sa.table(table_name,
+                     sa.column('id', sa.Integer),
+                     sa.column('latitude', sa.Float),
+                     sa.column('longitude', sa.Float),
+                     sa.column('geohash', sa.String))
+    update = (table.update()
+              .where(table.c.id == sa.bindparam('row_id'))
+              .values(geohash=sa.bindparam('cell')))
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(table.c.id, table.c.latitude, table.c.longitude)
+            .where(table.c.id > last_id,
+                   table.c.latitude.isnot(None),
+                   table.c.longitude.isnot(None))
+            .order_by(table.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        conn.execute(update, [{'row_id': r.id, 'cell': geohash_encode(r.latitude, r.longitude)}
+                              for r in rows])
+        last_id = rows[-1].id
+
+
+def upgrade():
+    for table_name in TABLES:
+        with op.batch_alter_table(table_name) as batch_op:
+            batch_op.add_column(sa.Column('geohash', sa.String(length=12), nullable=True))
+
+    op.create_index('ix_post_geohash', 'post', ['geohash'])
+    op.create_index('ix_post_category_geohash', 'post', ['category', 'geohash'])
+    op.create_index('ix_service_requests_category_geohash', 'service_requests', ['category', 'geohash'])
+    op.create_index('ix_service_offers_category_geohash', 'service_offers', ['category', 'geohash'])
+
+    for table_name in TABLES:
+        _backfill(table_name)
+
+
+def downgrade():
+    op.drop_index('ix_service_offers_category_geohash', table_name='service_offers')
+    op.drop_index('ix_service_requests_category_geohash', table_name='service_requests')
+    op.drop_index('ix_post_category_geohash', table_name='post')
+    op.drop_index('ix_post_geohash', table_name='post')
+
+    for table_name in reversed(TABLES):
+        with op.batch_alter_table(table_name) as batch_op:
+            batch_op.drop_column('geohash')
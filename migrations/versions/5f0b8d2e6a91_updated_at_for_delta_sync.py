@@ -0,0 +1,44 @@
+"""updated_at on service requests/offers and sync indexes
+
+Adds ``updated_at`` to service_requests and service_offers (backfilled from
+``created_at``), fills missing post timestamps/flags, and indexes
+(updated_at, id) on all three tables for the delta sync endpoint.
+
+Revision ID: 5f0b8d2e6a91
+Revises: c41d9e7f5a20
+Create Date: 2026-10-18 14:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f0b8d2e6a91'
+down_revision = 'c41d9e7f5a20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table_name in ('service_requests', 'service_offers'):
+        with op.batch_alter_table(table_name) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.execute(f'UPDATE {table_name} SET updated_at = created_at WHERE updated_at IS NULL')
+
+    op.execute('UPDATE post SET updated_at = created_at WHERE updated_at IS NULL')
+    op.execute(sa.text('UPDATE post SET deleted = :false WHERE deleted IS NULL').bindparams(false=False))
+
+    op.create_index('ix_post_updated_at_id', 'post', ['updated_at', 'id'])
+    op.create_index('ix_service_requests_updated_at_id', 'service_requests', ['updated_at', 'id'])
+    op.create_index('ix_service_offers_updated_at_id', 'service_offers', ['updated_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_service_offers_updated_at_id', table_name='service_offers')
+    op.drop_index('ix_service_requests_updated_at_id', table_name='service_requests')
+    op.drop_index('ix_post_updated_at_id', table_name='post')
+
+    for table_name in ('service_offers', 'service_requests'):
+        with op.batch_alter_table(table_name) as batch_op:
+            batch_op.drop_column('updated_at')
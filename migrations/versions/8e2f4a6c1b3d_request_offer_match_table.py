@@ -0,0 +1,40 @@
+"""request_offer_match table
+
+Stores precomputed ServiceRequest -> ServiceOffer matches. Existing data is
+not backfilled here because matching needs the application code; run
+``flask rebuild-matches`` once after upgrading.
+
+Revision ID: 8e2f4a6c1b3d
+Revises: 3b7c1e9a2d4f
+Create Date: 2026-10-18 12:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e2f4a6c1b3d'
+down_revision = '3b7c1e9a2d4f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('request_offer_match',
+    sa.Column('request_id', sa.Integer(), nullable=False),
+    sa.Column('offer_id', sa.Integer(), nullable=False),
+    sa.Column('distance_km', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['offer_id'], ['service_offers.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['request_id'], ['service_requests.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('request_id', 'offer_id')
+    )
+    op.create_index('ix_request_offer_match_request_distance', 'request_offer_match',
+                    ['request_id', 'distance_km'])
+    op.create_index('ix_request_offer_match_offer_id', 'request_offer_match', ['offer_id'])
+
+
+def downgrade():
+    op.drop_index('ix_request_offer_match_offer_id', table_name='request_offer_match')
+    op.drop_index('ix_request_offer_match_request_distance', table_name='request_offer_match')
+    op.drop_table('request_offer_match')
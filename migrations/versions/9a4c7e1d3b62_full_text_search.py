@@ -0,0 +1,64 @@
+"""full-text search indexes
+
+SQLite: external-content FTS5 tables ``<table>_fts`` over post title/content
+and service request/offer title/description, kept in sync by triggers and
+backfilled with the FTS5 'rebuild' command. Postgres: GIN indexes on the
+matching ``to_tsvector`` expressions. See app/search.py.
+
+Revision ID: 9a4c7e1d3b62
+Revises: 5f0b8d2e6a91
+Create Date: 2026-10-18 16:10:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4c7e1d3b62'
+down_revision = '5f0b8d2e6a91'
+branch_labels = None
+depends_on = None
+
+SEARCHABLE = {
+    'post': ('title', 'content'),
+    'service_requests': ('title', 'description'),
+    'service_offers': ('title', 'description'),
+}
+
+
+def _sqlite_upgrade(source, columns):
+    fts = f'{source}_fts'
+    cols = ', '.join(columns)
+    new = ', '.join(f'new.{c}' for c in columns)
+    old = ', '.join(f'old.{c}' for c in columns)
+    op.execute(f"CREATE VIRTUAL TABLE {fts} USING fts5({cols}, content='{source}', content_rowid='id')")
+    op.execute(f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {source} BEGIN "
+               f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END")
+    op.execute(f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {source} BEGIN "
+               f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); END")
+    op.execute(f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {cols} ON {source} BEGIN "
+               f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+               f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new}); END")
+    op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    for source, columns in SEARCHABLE.items():
+        if dialect == 'sqlite':
+            _sqlite_upgrade(source, columns)
+        elif dialect == 'postgresql':
+            document = " || ' ' || ".join(f"coalesce({c}, '')" for c in columns)
+            op.execute(f"CREATE INDEX ix_{source}_fts ON {source} "
+                       f"USING gin (to_tsvector('english'::regconfig, {document}))")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for source in SEARCHABLE:
+        if dialect == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute(f'DROP TRIGGER IF EXISTS {source}_fts_{suffix}')
+            op.execute(f'DROP TABLE IF EXISTS {source}_fts')
+        elif dialect == 'postgresql':
+            op.execute(f'DROP INDEX IF EXISTS ix_{source}_fts')
@@ -0,0 +1,29 @@
+"""post feed keyset indexes
+
+Composite (created_at, id) and (user_id, created_at, id) indexes backing the
+cursor-paginated feed.
+
+Revision ID: c41d9e7f5a20
+Revises: 8e2f4a6c1b3d
+Create Date: 2026-10-18 13:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41d9e7f5a20'
+down_revision = '8e2f4a6c1b3d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_post_created_at_id', 'post', ['created_at', 'id'])
+    op.create_index('ix_post_user_id_created_at_id', 'post', ['user_id', 'created_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_post_user_id_created_at_id', table_name='post')
+    op.drop_index('ix_post_created_at_id', table_name='post')
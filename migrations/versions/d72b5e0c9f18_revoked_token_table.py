@@ -0,0 +1,38 @@
+"""revoked_token table
+
+JWT ids revoked by logout. Workers mirror it into an in-memory set, so
+per-request revocation checks don't query it.
+
+Revision ID: d72b5e0c9f18
+Revises: 9a4c7e1d3b62
+Create Date: 2026-10-18 18:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd72b5e0c9f18'
+down_revision = '9a4c7e1d3b62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('revoked_token',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('jti', sa.String(length=64), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('jti')
+    )
+    op.create_index(op.f('ix_revoked_token_created_at'), 'revoked_token', ['created_at'], unique=False)
+    op.create_index(op.f('ix_revoked_token_expires_at'), 'revoked_token', ['expires_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_revoked_token_expires_at'), table_name='revoked_token')
+    op.drop_index(op.f('ix_revoked_token_created_at'), table_name='revoked_token')
+    op.drop_table('revoked_token')
@@ -0,0 +1,33 @@
+"""deleted flag on service requests and offers
+
+Deleting a request or offer now leaves a tombstone row (``deleted = true``)
+that the delta sync endpoint reports to offline clients, as posts already do.
+
+Plain ADD/DROP COLUMN rather than batch mode: recreating these SQLite tables
+would drop their full-text search triggers (DROP COLUMN needs SQLite 3.35+).
+
+Revision ID: e4a1c8b7d2f3
+Revises: d72b5e0c9f18
+Create Date: 2026-10-18 21:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a1c8b7d2f3'
+down_revision = 'd72b5e0c9f18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table_name in ('service_requests', 'service_offers'):
+        op.add_column(table_name, sa.Column('deleted', sa.Boolean(), nullable=True,
+                                            server_default=sa.false()))
+
+
+def downgrade():
+    for table_name in ('service_offers', 'service_requests'):
+        op.drop_column(table_name, 'deleted')
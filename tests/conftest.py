@@ -66,3 +66,15 @@ def auth_token(client):
 def auth_headers(auth_token):
     """Return headers containing JWT token for authorized requests."""
     return {"Authorization": f"Bearer {auth_token}"}
+
+
+@pytest.fixture
+def count_queries(app):
+    """``with count_queries() as q: ...`` records the SQL run inside the block.
+
+    Assert on ``q.count`` or ``q.repeated()``; compare counts for small and
+    large result sets to catch N+1 patterns.
+    """
+    from app.utils.query_guard import QueryCounter
+
+    return lambda: QueryCounter(db.engines.values())
@@ -0,0 +1,63 @@
+from app.utils.cache import MemoryBackend
+
+
+def test_memory_backend_lru_and_ttl(monkeypatch):
+    backend = MemoryBackend(max_entries=2)
+    backend.set("a", 1, ttl=None)
+    backend.set("b", 2, ttl=None)
+    backend.get("a")            # a is now most recently used
+    backend.set("c", 3, ttl=None)
+    assert backend.get("b") is None
+    assert backend.get("a") == 1
+
+    import app.utils.cache as cache_module
+    now = cache_module.time.monotonic()
+    backend.set("d", 4, ttl=10)
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now + 11)
+    assert backend.get("d") is None
+
+
+def test_post_reads_are_cached_and_invalidated_on_write(client, auth_headers):
+    post_id = client.post("/posts/", json={"title": "Cached", "content": "v1"},
+                          headers=auth_headers).get_json()["id"]
+
+    before = client.get("/status/cache").get_json().get("posts", {"hits": 0})["hits"]
+    assert client.get(f"/posts/{post_id}").get_json()["content"] == "v1"
+    assert client.get(f"/posts/{post_id}").get_json()["content"] == "v1"
+    assert client.get("/status/cache").get_json()["posts"]["hits"] == before + 1
+
+    client.put(f"/posts/{post_id}", json={"content": "v2"}, headers=auth_headers)
+    assert client.get(f"/posts/{post_id}").get_json()["content"] == "v2"
+
+
+def test_get_post_etag_and_304(client, auth_headers):
+    post_id = client.post("/posts/", json={"title": "ETag", "content": "v1"},
+                          headers=auth_headers).get_json()["id"]
+    first = client.get(f"/posts/{post_id}")
+    etag = first.headers["ETag"]
+    assert etag
+
+    cached = client.get(f"/posts/{post_id}", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.data == b""
+
+    client.put(f"/posts/{post_id}", json={"content": "v2"}, headers=auth_headers)
+    changed = client.get(f"/posts/{post_id}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+    assert client.get("/posts/999999", headers={"If-None-Match": etag}).status_code == 404
+
+
+def test_feed_and_matches_etags(client, auth_headers):
+    feed = client.get("/posts/?limit=5")
+    assert client.get("/posts/?limit=5", headers={"If-None-Match": feed.headers["ETag"]}).status_code == 304
+    client.post("/posts/", json={"title": "New", "content": "x"}, headers=auth_headers)
+    assert client.get("/posts/?limit=5", headers={"If-None-Match": feed.headers["ETag"]}).status_code == 200
+
+    request_id = client.post("/services/requests", json={
+        "title": "t", "description": "d", "category": "etag-test", "latitude": 1.0, "longitude": 1.0,
+    }, headers=auth_headers).get_json()["id"]
+    matches = client.get(f"/services/matches/{request_id}")
+    res = client.get(f"/services/matches/{request_id}", headers={"If-None-Match": matches.headers["ETag"]})
+    assert res.status_code == 304
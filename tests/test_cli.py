@@ -0,0 +1,35 @@
+import json
+
+
+def test_import_data_csv_and_ndjson(app, client, tmp_path, monkeypatch):
+    from app.extensions import db
+    from app.models import ServiceOffer, User
+
+    users = tmp_path / "users.csv"
+    users.write_text("username,email,password\nimporter,importer@example.com,secret\n")
+    offers = tmp_path / "offers.ndjson"
+    offers.write_text("\n".join(json.dumps({
+        "title": f"Painter {i}", "description": "x", "category": "painting",
+        "latitude": -26.30 - i * 0.01, "longitude": 28.10, "user_id": 1,
+    }) for i in range(5)) + "\n")
+
+    # a web worker whose index was built before the import
+    assert client.get("/services/offers/nearest?lat=-26.30&lon=28.10&category=painting").get_json() == []
+
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["import-data", "users", str(users)])
+    assert result.exit_code == 0, result.output
+    assert "Imported 1 users" in result.output
+    result = runner.invoke(args=["import-data", "offers", str(offers), "--batch-size", "2"])
+    assert result.exit_code == 0, result.output
+    assert "Imported 5 offers" in result.output and "rows/s" in result.output
+
+    with app.app_context():
+        assert db.session.scalars(db.select(User).filter_by(username="importer")).one().verify_password("secret")
+        imported = db.session.scalars(db.select(ServiceOffer).filter_by(category="painting")).all()
+        assert len(imported) == 5
+        assert all(o.geohash and o.radius_km == 10.0 and o.created_at for o in imported)
+
+    monkeypatch.setitem(app.config, "SPATIAL_INDEX_SYNC_SECONDS", 0)
+    res = client.get("/services/offers/nearest?lat=-26.30&lon=28.10&category=painting&k=2")
+    assert [o["title"] for o in res.get_json()] == ["Painter 0", "Painter 1"]
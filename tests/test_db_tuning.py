@@ -0,0 +1,17 @@
+from sqlalchemy import text
+
+
+def test_sqlite_pragmas_applied_on_connect(app):
+    from app.extensions import db
+    with app.app_context():
+        assert db.session.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert db.session.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        assert db.session.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+
+
+def test_pool_status_reports_gauges_and_counters(client):
+    client.get("/posts/")
+    data = client.get("/status/pool").get_json()["default"]
+    assert data["pool"] == "QueuePool" and data["size"] == 5
+    assert data["connects"] >= 1
+    assert data["checkouts"] >= data["checkins"] >= 1
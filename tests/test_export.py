@@ -0,0 +1,39 @@
+import json
+
+
+def test_export_posts_ndjson_with_filters(client, auth_headers):
+    client.post("/posts/", json={"title": "Export in box", "content": "x",
+                                 "latitude": -26.0, "longitude": 28.0}, headers=auth_headers)
+    client.post("/posts/", json={"title": "Export outside", "content": "x",
+                                 "latitude": 10.0, "longitude": 10.0}, headers=auth_headers)
+
+    res = client.get("/export/posts?bbox=27.5,-26.5,28.5,-25.5", headers=auth_headers)
+    assert res.status_code == 200
+    assert res.mimetype == "application/x-ndjson"
+    rows = [json.loads(line) for line in res.get_data(as_text=True).splitlines()]
+    assert [r["title"] for r in rows] == ["Export in box"]
+    assert "geohash" not in rows[0]
+
+
+def test_export_offers_as_json_array(client, auth_headers):
+    client.post("/services/offers", json={"title": "Export offer", "description": "d",
+                                          "category": "export-cat"}, headers=auth_headers)
+    res = client.get("/export/offers?format=json&category=export-cat", headers=auth_headers)
+    assert [o["title"] for o in json.loads(res.get_data(as_text=True))] == ["Export offer"]
+
+    empty = client.get("/export/requests?format=json&updated_since=2999-01-01T00:00:00", headers=auth_headers)
+    assert json.loads(empty.get_data(as_text=True)) == []
+
+
+def test_export_skips_deleted_posts(client, auth_headers):
+    post_id = client.post("/posts/", json={"title": "Export deleted", "content": "x",
+                                           "category": "export-deleted"}, headers=auth_headers).get_json()["id"]
+    client.delete(f"/posts/{post_id}", headers=auth_headers)
+    res = client.get("/export/posts?format=json&category=export-deleted", headers=auth_headers)
+    assert json.loads(res.get_data(as_text=True)) == []
+
+
+def test_export_errors(client, auth_headers):
+    assert client.get("/export/posts").status_code == 401
+    assert client.get("/export/users", headers=auth_headers).status_code == 404
+    assert client.get("/export/posts?bbox=nope", headers=auth_headers).status_code == 400
@@ -0,0 +1,45 @@
+import numpy as np
+from app.utils.geo import geohash_cover, geohash_encode, haversine_km, radius_filter, within_radius
+
+
+def test_haversine_matches_known_distance():
+    # Johannesburg -> Cape Town is roughly 1260 km
+    d = haversine_km(-26.2041, 28.0473, [-33.9249], [18.4241])
+    assert abs(d[0] - 1262) < 5
+
+
+def test_within_radius_returns_distances_and_mask():
+    distances, mask = within_radius(0.0, 0.0, [0.0, 0.0, 1.0], [0.0, 0.05, 1.0], 10)
+    assert distances[0] == 0.0
+    assert mask.tolist() == [True, True, False]
+    assert np.all(distances >= 0)
+
+
+def test_radius_filter_sorts_by_distance():
+    points = [("far", 0.0, 0.08), ("near", 0.0, 0.01), ("out", 5.0, 5.0)]
+    assert [k for k, _ in radius_filter(0.0, 0.0, points, 10)] == ["near", "far"]
+    assert radius_filter(0.0, 0.0, [], 10) == []
+
+
+def test_geohash_encode_known_value():
+    assert geohash_encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+
+
+def test_geohash_cover_contains_nearby_points():
+    prefixes = geohash_cover(-26.2041, 28.0473, 5)
+    assert len(prefixes) <= 32
+    for lat, lon in [(-26.2041, 28.0473), (-26.23, 28.07), (-26.18, 28.02)]:
+        cell = geohash_encode(lat, lon)
+        assert any(cell.startswith(p) for p in prefixes)
+
+
+def test_geohash_cover_near_poles_contains_every_point_in_radius():
+    rng = np.random.default_rng(3)
+    for lat, lon, radius_km in [(84.0, 10.0, 500), (-86.5, -170.0, 500), (89.9, 0.0, 50), (80.0, 179.9, 300)]:
+        prefixes = geohash_cover(lat, lon, radius_km)
+        lats = rng.uniform(max(-90, lat - 10), min(90, lat + 10), 20_000)
+        lons = rng.uniform(-180, 180, 20_000)
+        inside = haversine_km(lat, lon, lats, lons) <= radius_km
+        assert inside.any()
+        for a, o in zip(lats[inside], lons[inside]):
+            assert any(geohash_encode(a, o).startswith(p) for p in prefixes), (lat, lon, a, o)
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+from app.extensions import blocklist, db, user_cache
+from app.models import RevokedToken, User
+
+
+def _login(client):
+    res = client.post("/auth/login", json={"username": "testuser", "password": "password"})
+    return {"Authorization": f"Bearer {res.get_json()['access_token']}"}
+
+
+def test_current_user_is_cached_and_invalidated_on_update(app, client):
+    headers = _login(client)
+    with app.app_context():
+        before = user_cache.stats()
+    assert client.get("/auth/me", headers=headers).get_json()["username"] == "testuser"
+    assert client.get("/auth/me", headers=headers).get_json()["username"] == "testuser"
+    with app.app_context():
+        after = user_cache.stats()
+        assert after["hits"] >= before["hits"] + 1
+
+        user = db.session.get(User, 1)
+        user.email = "renamed@example.com"
+        db.session.commit()
+        assert user_cache.stats()["invalidations"] == after["invalidations"] + 1
+    client.get("/auth/me", headers=headers)
+    with app.app_context():
+        assert user_cache.stats()["misses"] == after["misses"] + 1
+
+    with app.app_context():
+        db.session.get(User, 1).email = "test@example.com"
+        db.session.commit()
+
+
+def test_logout_revokes_token_across_workers(app, client):
+    headers = _login(client)
+    assert client.get("/auth/me", headers=headers).status_code == 200
+    assert client.post("/auth/logout", headers=headers).status_code == 200
+    res = client.get("/auth/me", headers=headers)
+    assert res.status_code == 401 and res.get_json()["msg"] == "Token revoked"
+
+    # a fresh worker learns the revocation from the table on its first sync
+    blocklist.init_app(app)
+    assert client.get("/auth/me", headers=headers).status_code == 401
+    assert client.get("/auth/me", headers=_login(client)).status_code == 200
+
+
+def test_blocklist_sync_catches_late_commits_and_prunes_expired(app):
+    with app.app_context():
+        state = app.extensions["token_blocklist"]
+        blocklist.is_revoked("warm-up")
+        state["revoked"]["long-expired"] = datetime.utcnow() - timedelta(minutes=1)
+
+        # committed after the last sync, but stamped (and numbered) before it
+        db.session.add(RevokedToken(jti="late-commit", expires_at=datetime.utcnow() + timedelta(hours=1),
+                                    created_at=state["synced_since"] - timedelta(seconds=10)))
+        db.session.commit()
+        state["synced_at"] -= app.config["JWT_BLOCKLIST_SYNC_SECONDS"]
+
+        assert blocklist.is_revoked("late-commit")
+        assert "long-expired" not in state["revoked"]
@@ -0,0 +1,218 @@
+def _offer(client, headers, title, lat, lon, category="electrical", **extra):
+    res = client.post("/services/offers", json=dict({
+        "title": title, "description": title, "category": category,
+        "latitude": lat, "longitude": lon,
+    }, **extra), headers=headers)
+    assert res.status_code == 201
+    return res.get_json()["id"]
+
+
+def _request(client, headers, lat, lon, radius_km=5, category="electrical"):
+    res = client.post("/services/requests", json={
+        "title": "Need electrician", "description": "Wiring", "category": category,
+        "latitude": lat, "longitude": lon, "radius_km": radius_km,
+    }, headers=headers)
+    assert res.status_code == 201
+    return res.get_json()["id"]
+
+
+def test_matches_are_stored_when_request_created(client, auth_headers):
+    _offer(client, auth_headers, "Sparky", -25.7479, 28.2293)
+    request_id = _request(client, auth_headers, -25.7460, 28.2290)
+    data = client.get(f"/services/matches/{request_id}").get_json()
+    assert [o["title"] for o in data] == ["Sparky"]
+    assert data[0]["distance_km"] < 1
+
+
+def test_offer_move_and_delete_update_matches(client, auth_headers):
+    request_id = _request(client, auth_headers, -25.8600, 28.1890)
+    offer_id = _offer(client, auth_headers, "Mobile sparky", -25.8610, 28.1900)
+    assert [o["id"] for o in client.get(f"/services/matches/{request_id}").get_json()] == [offer_id]
+
+    # move far outside the request radius
+    res = client.put(f"/services/offers/{offer_id}", json={"latitude": -29.0, "longitude": 31.0},
+                     headers=auth_headers)
+    assert res.status_code == 200
+    assert client.get(f"/services/matches/{request_id}").get_json() == []
+
+    client.put(f"/services/offers/{offer_id}", json={"latitude": -25.8605, "longitude": 28.1895},
+               headers=auth_headers)
+    assert [o["id"] for o in client.get(f"/services/matches/{request_id}").get_json()] == [offer_id]
+
+    assert client.delete(f"/services/offers/{offer_id}", headers=auth_headers).status_code == 200
+    assert client.get(f"/services/matches/{request_id}").get_json() == []
+
+
+def test_matches_unknown_request(client):
+    assert client.get("/services/matches/999999").status_code == 404
+
+
+def test_offer_matches_use_mutual_radius(app, client, auth_headers):
+    from app.extensions import db
+    from app.models import ServiceOffer
+
+    # ~1.1 km away, requester radius 5 km: reachable both ways
+    near_id = _request(client, auth_headers, -33.9249, 18.4341, radius_km=5, category="tutoring")
+    # ~3.3 km away, requester radius 10 km but outside the offer's 2 km service radius
+    _request(client, auth_headers, -33.9249, 18.4601, radius_km=10, category="tutoring")
+    # ~1.1 km away but requester only wants within 0.5 km
+    _request(client, auth_headers, -33.9149, 18.4241, radius_km=0.5, category="tutoring")
+
+    offer_id = _offer(client, auth_headers, "Maths tutor", -33.9249, 18.4241,
+                      category="tutoring", radius_km=2)
+
+    data = client.get(f"/services/offers/{offer_id}/matches").get_json()
+    assert [r["id"] for r in data] == [near_id]
+
+    with app.app_context():
+        offer = db.session.get(ServiceOffer, offer_id)
+        assert [r.id for r in offer.match()] == [near_id]
+
+
+def test_batch_matches_group_results_by_request(client, auth_headers):
+    a = _request(client, auth_headers, -26.1076, 28.0567, category="gardening")
+    b = _request(client, auth_headers, -26.2708, 28.1123, category="gardening")
+    near_a = _offer(client, auth_headers, "Sandton gardener", -26.1080, 28.0570, category="gardening")
+    near_b = _offer(client, auth_headers, "Alberton gardener", -26.2700, 28.1120, category="gardening")
+
+    res = client.post("/services/matches/batch", json={"request_ids": [a, b, 999999]})
+    assert res.status_code == 200
+    data = res.get_json()
+    assert [o["id"] for o in data["results"][str(a)]] == [near_a]
+    assert [o["id"] for o in data["results"][str(b)]] == [near_b]
+    assert data["missing"] == [999999]
+
+    # same answer as the per-request endpoint
+    assert data["results"][str(a)] == client.get(f"/services/matches/{a}").get_json()
+
+    assert client.post("/services/matches/batch", json={"request_ids": "x"}).status_code == 400
+
+
+def test_bulk_offers_insert_and_match(app, client, auth_headers):
+    request_id = _request(client, auth_headers, -26.7100, 27.8300, category="tiling")
+    res = client.post("/services/offers/bulk", json={"items": [
+        {"title": "Tiler A", "description": "x", "category": "tiling", "latitude": -26.7105, "longitude": 27.8305},
+        {"title": "Missing category", "description": "x"},
+        {"title": "Tiler far", "description": "x", "category": "tiling", "latitude": -29.0, "longitude": 31.0},
+    ]}, headers=auth_headers)
+    assert res.status_code == 201
+    body = res.get_json()
+    assert (body["created"], body["failed"]) == (2, 1)
+    assert body["results"][1] == {"index": 1, "error": "category is required"}
+    near_id = body["results"][0]["id"]
+    assert body["results"][2]["id"] == near_id + 1
+
+    with app.app_context():
+        from app.extensions import db
+        from app.models import ServiceOffer
+        assert db.session.get(ServiceOffer, near_id).geohash.startswith("ke")
+    assert [o["id"] for o in client.get(f"/services/matches/{request_id}").get_json()] == [near_id]
+    res = client.get("/services/offers/nearest?lat=-26.71&lon=27.83&category=tiling&k=1")
+    assert [o["id"] for o in res.get_json()] == [near_id]
+
+
+def test_bulk_requests_are_matched(client, auth_headers):
+    offer_id = _offer(client, auth_headers, "Glazier", -26.6000, 27.9000, category="glazing")
+    res = client.post("/services/requests/bulk", json={"items": [
+        {"title": "Window", "description": "x", "category": "glazing",
+         "latitude": -26.6010, "longitude": 27.9010, "radius_km": 5},
+        {"title": "Bad", "description": "x", "category": "glazing", "latitude": "north"},
+    ]}, headers=auth_headers)
+    body = res.get_json()
+    assert body["results"][1]["error"] == "Invalid latitude/longitude/radius_km"
+    request_id = body["results"][0]["id"]
+    assert [o["id"] for o in client.get(f"/services/matches/{request_id}").get_json()] == [offer_id]
+    assert client.post("/services/requests/bulk", json={"items": []}, headers=auth_headers).status_code == 400
+    res = client.post("/services/requests/bulk", json={"items": [{"title": "Bad", "description": "x"}]},
+                      headers=auth_headers)
+    assert res.status_code == 400
+    assert res.get_json()["results"] == [{"index": 0, "error": "category is required"}]
+
+
+def test_bulk_offers_validate_price_and_upsert_by_id(app, client, auth_headers):
+    request_id = _request(client, auth_headers, -26.5000, 27.7000, category="roofing")
+    res = client.post("/services/offers/bulk", json={"items": [
+        {"title": "Roofer", "description": "x", "category": "roofing",
+         "latitude": -29.0, "longitude": 31.0, "hourly_rate": "150"},
+        {"title": "Bad rate", "description": "x", "category": "roofing", "hourly_rate": "abc"},
+    ]}, headers=auth_headers)
+    assert res.status_code == 201
+    body = res.get_json()
+    assert (body["created"], body["failed"]) == (1, 1)
+    assert body["results"][1] == {"index": 1, "error": "Invalid hourly_rate"}
+    offer_id = body["results"][0]["id"]
+    assert client.get(f"/services/matches/{request_id}").get_json() == []
+
+    # same id again: the offer moves next to the request instead of being duplicated
+    res = client.post("/services/offers/bulk", json={"items": [
+        {"id": offer_id, "title": "Roofer", "description": "moved", "category": "roofing",
+         "latitude": -26.5005, "longitude": 27.7005, "hourly_rate": 200},
+        {"id": 999999, "title": "Ghost", "description": "x", "category": "roofing"},
+    ]}, headers=auth_headers)
+    assert res.status_code == 200  # nothing created
+    body = res.get_json()
+    assert (body["created"], body["updated"], body["failed"]) == (0, 1, 1)
+    assert body["results"][0] == {"index": 0, "id": offer_id, "updated": True}
+    assert body["results"][1]["error"] == "ServiceOffer 999999 not found"
+    matches = client.get(f"/services/matches/{request_id}").get_json()
+    assert [(o["id"], o["hourly_rate"], o["description"]) for o in matches] == [(offer_id, 200.0, "moved")]
+
+
+def test_blended_profile_reranks_stored_matches(client, auth_headers):
+    res = client.post("/services/requests", json={
+        "title": "Burst geyser", "description": "Geyser leaking in roof", "category": "geysers",
+        "latitude": -26.1000, "longitude": 28.0000, "radius_km": 10, "budget": 300,
+    }, headers=auth_headers)
+    request_id = res.get_json()["id"]
+    near = _offer(client, auth_headers, "Handyman", -26.1005, 28.0005, category="geysers", hourly_rate=900)
+    apt = _offer(client, auth_headers, "Geyser leaking repairs", -26.1300, 28.0300,
+                 category="geysers", hourly_rate=250)
+
+    blended = client.get(f"/services/matches/{request_id}").get_json()
+    assert [o["id"] for o in blended] == [apt, near]  # MATCH_SCORING_PROFILE is "balanced"
+    assert blended[0]["score"] > blended[1]["score"]
+    assert client.get(f"/services/matches/{request_id}?profile=balanced").get_json() == blended
+    nearest = client.get(f"/services/matches/{request_id}?profile=nearest").get_json()
+    assert [o["id"] for o in nearest] == [near, apt]
+    assert "score" not in nearest[0]
+    assert client.get(f"/services/matches/{request_id}?profile=bogus").status_code == 400
+
+    batch = client.post("/services/matches/batch", json={"request_ids": [request_id]}).get_json()
+    assert batch["results"][str(request_id)] == blended
+    batch = client.post("/services/matches/batch", json={"request_ids": [request_id], "profile": "nearest"})
+    assert batch.get_json()["results"][str(request_id)] == nearest
+    assert client.post("/services/matches/batch", json={"request_ids": [request_id],
+                                                       "profile": "bogus"}).status_code == 400
+
+
+def test_text_similarity_is_cosine_over_words():
+    from app.scoring import text_similarity
+    sims = text_similarity("leaking geyser", ["Geyser leaking", "geyser", "painting", ""])
+    assert abs(sims[0] - 1) < 1e-9
+    assert 0 < sims[1] < 1
+    assert sims[2] == sims[3] == 0
+
+
+def test_refreshes_lock_each_category_once_in_order_on_postgres(app):
+    from sqlalchemy.dialects import postgresql
+    from app.extensions import db
+    from app.matching import lock_categories
+
+    class RecordingSession:
+        def __init__(self):
+            self.locked = []
+
+        def get_bind(self):
+            return type("Bind", (), {"dialect": postgresql.dialect()})()
+
+        def execute(self, stmt):
+            compiled = stmt.compile(dialect=postgresql.dialect())
+            assert "pg_advisory_xact_lock(hashtext(" in str(compiled)
+            self.locked.extend(compiled.params.values())
+
+    session = RecordingSession()
+    lock_categories(session, ["tiling", "glazing", "tiling", None])
+    assert session.locked == ["glazing", "tiling"]
+
+    with app.app_context():
+        lock_categories(db.session, ["tiling"])  # SQLite serializes writers already; no-op
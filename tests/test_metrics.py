@@ -0,0 +1,49 @@
+import time
+
+from app.utils.metrics import Histogram
+from app.utils.profiler import SamplingProfiler
+
+
+def test_histogram_renders_cumulative_buckets():
+    hist = Histogram("x_seconds", "Test.", ("endpoint",), (0.1, 1))
+    for value in (0.05, 0.5, 2):
+        hist.observe(value, "e")
+    lines = hist.render()
+    assert 'x_seconds_bucket{endpoint="e",le="0.1"} 1' in lines
+    assert 'x_seconds_bucket{endpoint="e",le="1"} 2' in lines
+    assert 'x_seconds_bucket{endpoint="e",le="+Inf"} 3' in lines
+    assert 'x_seconds_count{endpoint="e"} 3' in lines
+
+
+def test_metrics_endpoint_reports_latency_sql_and_candidates(client):
+    client.get("/posts/")
+    client.get("/posts/nearby?lat=-26.2&lon=28.04&radius_km=5")
+    res = client.get("/metrics")
+    assert res.status_code == 200
+    assert res.mimetype == "text/plain"
+    body = res.get_data(as_text=True)
+    assert 'kasilink_request_duration_seconds_count{endpoint="posts.list_posts",method="GET"}' in body
+    assert 'kasilink_requests_total{endpoint="posts.nearby_posts",method="GET",status="200"}' in body
+    assert 'kasilink_sql_queries_per_request_count{endpoint="posts.list_posts"}' in body
+    assert 'kasilink_geo_candidates_count{model="Post"}' in body
+    assert 'kasilink_serialization_seconds_count{stage="json"}' in body
+
+
+def _busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_sampling_profiler_writes_collapsed_stacks(tmp_path):
+    profiler = SamplingProfiler(interval=0.001, output_dir=str(tmp_path))
+    profiler.begin()
+    _busy(0.05)
+    path = profiler.end("GET posts.list_posts")
+    lines = open(path).read().splitlines()
+    assert lines and any("_busy (test_metrics.py" in line for line in lines)
+    stack, count = lines[0].rsplit(" ", 1)
+    assert ";" in stack and int(count) > 0
+
+    profiler.begin()
+    assert profiler.end(None) is None  # fast requests are discarded
@@ -0,0 +1,46 @@
+from app.utils.rate_limit import MemoryBackend, parse_rate
+
+
+def test_token_bucket_refills_at_rate(monkeypatch):
+    import app.utils.rate_limit as rate_limit
+
+    now = [100.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    backend = MemoryBackend()
+    capacity, period = parse_rate("2/minute")
+    assert [backend.take("k", capacity, period)[0] for _ in range(3)] == [True, True, False]
+    assert backend.take("k", capacity, period)[1] == 30  # one token every 30s
+    now[0] += 30
+    assert backend.take("k", capacity, period)[0]
+    assert backend.take("other", capacity, period)[0]
+
+
+def test_rate_limit_per_identity_returns_429(app, client, auth_headers):
+    app.config["RATE_LIMITS"]["posts.get_post"] = "2/minute"
+    try:
+        post_id = client.post("/posts/", json={"title": "Limited", "content": "x"},
+                              headers=auth_headers).get_json()["id"]
+        codes = [client.get(f"/posts/{post_id}").status_code for _ in range(3)]
+        assert codes == [200, 200, 429]
+        # a logged-in caller has its own bucket, separate from the anonymous IP bucket
+        assert client.get(f"/posts/{post_id}", headers=auth_headers).status_code == 200
+        limited = client.get(f"/posts/{post_id}")
+        assert limited.headers["Retry-After"] == "30"
+    finally:
+        del app.config["RATE_LIMITS"]["posts.get_post"]
+    assert client.get("/status/throttling").get_json()["rate_limited"] >= 2
+
+
+def test_load_shedder_returns_503_beyond_in_flight_limit(app, client):
+    state = app.extensions["load_shedder"]
+    app.config["LOAD_SHED_MAX_IN_FLIGHT"] = 1
+    try:
+        assert client.get("/posts/").status_code == 200
+        state["in_flight"] += 1  # another request is still running
+        res = client.get("/posts/")
+        assert res.status_code == 503 and res.headers["Retry-After"] == "1"
+        assert client.get("/status/throttling").get_json()["shed"] == 1
+    finally:
+        state["in_flight"] -= 1
+        app.config["LOAD_SHED_MAX_IN_FLIGHT"] = 0
+    assert state["in_flight"] == 0
@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import func, insert, select
+
+from app import create_app
+from app.extensions import db
+from app.models import Post, User
+from app.utils.read_replicas import replica_reads
+from config import TestingConfig
+
+
+@pytest.fixture
+def replica_app(tmp_path):
+    class ReplicaConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'primary.db'}"
+        SQLALCHEMY_BINDS = {"replica_0": f"sqlite:///{tmp_path / 'replica.db'}"}
+        SQLALCHEMY_READ_REPLICAS = ["replica_0"]
+
+    app = create_app(ReplicaConfig)
+    with app.app_context():
+        db.create_all()
+        db.metadata.create_all(db.engines["replica_0"])
+        with db.engines["replica_0"].begin() as conn:
+            conn.execute(insert(User), [{"id": 1, "username": "r", "email": "r@example.com"}])
+            conn.execute(insert(Post), [{"id": 7, "title": "Only on replica", "content": "x",
+                                         "user_id": 1, "deleted": False}])
+    yield app
+    # each bind key registers a metadata on the shared db object; don't leak it to other apps
+    db.metadatas.pop("replica_0", None)
+
+
+def test_read_only_views_are_served_by_replica(replica_app):
+    app = replica_app
+    client = app.test_client()
+    assert client.get("/posts/7").get_json()["title"] == "Only on replica"
+    # write routes and unwrapped views keep using the primary
+    with app.app_context():
+        assert db.session.get(Post, 7) is None
+
+
+def test_reads_after_a_write_go_to_primary(replica_app):
+    app = replica_app
+    with app.app_context():
+        with replica_reads():
+            assert db.session.scalar(select(func.count(Post.id))) == 1
+            db.session.add(User(id=2, username="p", email="p@example.com"))
+            db.session.flush()
+            assert db.session.scalar(select(func.count(Post.id))) == 0
+            assert db.session.get(User, 2) is not None
+        db.session.rollback()
@@ -145,3 +145,96 @@ def test_nearby_search(client, auth_headers):
     titles = [p['title'] for p in data]
     assert 'Near Post' in titles
     assert 'Far Post' not in titles
+
+
+def test_feed_cursor_pagination(client, auth_headers):
+    created = []
+    for i in range(5):
+        res = client.post("/posts/", json={"title": f"Feed {i}", "content": "x"}, headers=auth_headers)
+        created.append(res.get_json()["id"])
+
+    seen = []
+    cursor = ""
+    while cursor is not None:
+        data = client.get(f"/posts/?limit=2&cursor={cursor}").get_json()
+        assert len(data["items"]) <= 2
+        seen.extend(p["id"] for p in data["items"])
+        cursor = data["next_cursor"]
+
+    # newest first, every post exactly once
+    assert len(seen) == len(set(seen))
+    assert [i for i in seen if i in created] == created[::-1]
+
+    assert client.get("/posts/?cursor=not-a-cursor").status_code == 400
+
+
+def test_lean_feed_matches_schema_output(app, client, auth_headers):
+    client.post("/posts/", json={"title": "Lean", "content": "x", "latitude": 1.5, "longitude": 2.5},
+                headers=auth_headers)
+    lean = client.get("/posts/?limit=50").get_json()["items"]
+    app.config["LEAN_LIST_SERIALIZATION"] = False
+    try:
+        full = client.get("/posts/?limit=50&schema=1").get_json()["items"]
+    finally:
+        app.config["LEAN_LIST_SERIALIZATION"] = True
+    assert lean == full
+
+
+def _posts_by_distinct_authors(n, prefix):
+    from app.models import Post, User
+    for i in range(n):
+        user = User(username=f"{prefix}{i}", email=f"{prefix}{i}@example.com", _password="x")
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Post(title=f"{prefix} {i}", content="x", user_id=user.id,
+                            latitude=-26.2 + i * 0.001, longitude=28.04))
+    db.session.commit()
+
+
+@pytest.mark.parametrize("lean", [True, False])
+def test_feed_query_count_does_not_grow_with_page_size(app, client, count_queries, lean):
+    _posts_by_distinct_authors(8, f"feedauthor{int(lean)}_")
+    app.config["LEAN_LIST_SERIALIZATION"] = lean
+    try:
+        counts = []
+        for limit in (2, 8):
+            with count_queries() as q:
+                assert len(client.get(f"/posts/?limit={limit}&lean={lean}").get_json()["items"]) == limit
+            counts.append(q.count)
+    finally:
+        app.config["LEAN_LIST_SERIALIZATION"] = True
+    assert counts[0] == counts[1]
+    assert not q.repeated()
+
+
+def test_nearby_query_count_does_not_grow_with_results(client, count_queries):
+    _posts_by_distinct_authors(6, "nearbyauthor_")
+    client.get("/posts/nearby?lat=0&lon=0&radius_km=1")  # builds the spatial index
+    counts = []
+    for radius in (0.05, 5):
+        with count_queries() as q:
+            res = client.get(f"/posts/nearby?lat=-26.2&lon=28.04&radius_km={radius}")
+        assert res.status_code == 200
+        counts.append(q.count)
+    assert counts[0] == counts[1]
+
+
+def test_detector_flags_endpoint_whose_queries_grow_with_rows():
+    from app.models import Post
+
+    flagged_app = create_app()
+    flagged_app.config["N_PLUS_ONE_MIN_ROWS"] = 3
+
+    @flagged_app.route("/_authors/<int:n>")
+    def authors(n):
+        posts = Post.query.filter(Post.title.like("detector %")).order_by(Post.id).limit(n).all()
+        return {"items": [p.user.username for p in posts]}  # lazy load per author
+
+    with flagged_app.app_context():
+        _posts_by_distinct_authors(5, "detector")
+    client = flagged_app.test_client()
+    small, large = client.get("/_authors/1"), client.get("/_authors/5")
+    assert int(large.headers["X-Query-Count"]) - int(small.headers["X-Query-Count"]) >= 4
+
+    flagged = client.get("/status/nplusone").get_json()["flagged"]
+    assert [(f["endpoint"], f["reason"]) for f in flagged] == [("authors", "grows_with_rows")]
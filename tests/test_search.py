@@ -0,0 +1,41 @@
+def test_search_posts_ranked_and_kept_in_sync(client, auth_headers):
+    ids = {}
+    for title, content in [("Braai stand", "Wood and charcoal for your braai"),
+                           ("Charcoal", "Charcoal charcoal charcoal, bulk bags"),
+                           ("Haircut", "Fades and braids in Mamelodi")]:
+        res = client.post("/posts/", json={"title": title, "content": content}, headers=auth_headers)
+        ids[title] = res.get_json()["id"]
+
+    data = client.get("/search?q=charcoal").get_json()
+    assert [p["id"] for p in data["items"]] == [ids["Charcoal"], ids["Braai stand"]]
+    assert data["items"][0]["score"] >= data["items"][1]["score"]
+
+    page = client.get("/search?q=charcoal&limit=1&page=2").get_json()
+    assert [p["id"] for p in page["items"]] == [ids["Braai stand"]] and not page["has_more"]
+
+    client.put(f"/posts/{ids['Haircut']}", json={"content": "Charcoal grey dye"}, headers=auth_headers)
+    client.delete(f"/posts/{ids['Charcoal']}", headers=auth_headers)
+    data = client.get("/search?q=charcoal").get_json()
+    assert {p["id"] for p in data["items"]} == {ids["Braai stand"], ids["Haircut"]}
+
+    # FTS operators and quotes in user input are treated as plain words
+    assert client.get('/search?q="charcoal" OR NEAR(').status_code == 200
+    assert client.get("/search").status_code == 400
+    assert client.get("/search?q=x&type=users").status_code == 400
+
+
+def test_search_offers_with_category_and_radius(client, auth_headers):
+    for title, category, lat in [("Solar geyser installs", "plumbing", -25.75),
+                                 ("Solar panel cleaning", "electrical", -25.75),
+                                 ("Solar geyser repairs", "plumbing", -29.00)]:
+        client.post("/services/offers", json={"title": title, "description": "Solar specialists",
+                                              "category": category, "latitude": lat, "longitude": 28.20},
+                    headers=auth_headers)
+
+    data = client.get("/search?q=solar+geyser&type=offers&category=plumbing").get_json()
+    assert sorted(o["title"] for o in data["items"]) == ["Solar geyser installs", "Solar geyser repairs"]
+
+    data = client.get("/search?q=solar&type=offers&category=plumbing"
+                      "&lat=-25.75&lon=28.20&radius_km=20").get_json()
+    assert [o["title"] for o in data["items"]] == ["Solar geyser installs"]
+    assert data["items"][0]["distance_km"] == 0
@@ -0,0 +1,125 @@
+import time
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app.extensions import db, hasher
+from app.models import User
+
+
+def test_legacy_werkzeug_hash_is_upgraded_on_login(app, client):
+    with app.app_context():
+        user = User(username="legacy", email="legacy@example.com",
+                    _password=generate_password_hash("old-secret"))
+        db.session.add(user)
+        db.session.commit()
+
+    before = client.get("/status/hashing").get_json()["rehashes"]
+    res = client.post("/auth/login", json={"username": "legacy", "password": "old-secret"})
+    assert res.status_code == 200
+    assert client.get("/status/hashing").get_json()["rehashes"] == before + 1
+
+    with app.app_context():
+        stored = db.session.scalars(db.select(User).filter_by(username="legacy")).one()._password
+        assert stored.startswith("$scrypt$ln=15,")
+    assert client.post("/auth/login", json={"username": "legacy", "password": "old-secret"}).status_code == 200
+    assert client.post("/auth/login", json={"username": "legacy", "password": "nope"}).status_code == 401
+
+
+def test_cost_change_triggers_rehash(app):
+    with app.test_request_context():
+        stored = hasher.hash("pw")
+        assert hasher.verify("pw", stored) == (True, None)
+        rounds = app.config["PASSWORD_HASH_ROUNDS"]
+        app.config["PASSWORD_HASH_ROUNDS"] = dict(rounds, scrypt=14)
+        try:
+            ok, new_hash = hasher.verify("pw", stored)
+        finally:
+            app.config["PASSWORD_HASH_ROUNDS"] = rounds
+        assert ok and new_hash.startswith("$scrypt$ln=14,")
+        stats = hasher.stats()
+        assert stats["hash"]["count"] >= 1 and stats["verify"]["avg_ms"] > 0
+
+
+def test_process_pool_hashing():
+    from flask import Flask
+    from app.utils.security import PasswordHasher
+
+    app = Flask(__name__)
+    app.config.update(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_ROUNDS={"scrypt": 14})
+    pool_hasher = PasswordHasher(app)
+    with app.app_context():
+        stored = pool_hasher.hash("pw")
+        assert pool_hasher.verify("pw", stored) == (True, None)
+        app.extensions["password_hasher"]["pool"].shutdown()
+
+
+def test_rounds_are_per_scheme_and_bounded(app):
+    from app.utils.security import scheme_rounds
+
+    config = {"PASSWORD_HASH_SCHEME": "pbkdf2_sha256", "PASSWORD_HASH_ROUNDS": {"scrypt": 15}}
+    assert scheme_rounds(config) == ("pbkdf2_sha256", 600_000)
+    config["PASSWORD_HASH_ROUNDS"] = {"pbkdf2_sha256": 15}
+    with pytest.raises(ValueError):
+        scheme_rounds(config)
+
+    with app.test_request_context():
+        scheme = app.config["PASSWORD_HASH_SCHEME"]
+        app.config["PASSWORD_HASH_SCHEME"] = "pbkdf2_sha256"
+        try:
+            assert hasher.hash("pw").startswith("$pbkdf2-sha256$600000$")
+        finally:
+            app.config["PASSWORD_HASH_SCHEME"] = scheme
+
+
+def test_pool_timeout_is_reported_as_busy(monkeypatch):
+    from concurrent.futures import Future
+    from flask import Flask
+    from app.utils.security import HasherBusy, PasswordHasher
+
+    app = Flask(__name__)
+    app.config.update(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_TIMEOUT=0.01)
+    pool_hasher = PasswordHasher(app)
+
+    class StuckPool:
+        def submit(self, fn, *args):
+            return Future()  # never completes
+
+    monkeypatch.setattr(pool_hasher, "_pool", lambda state: StuckPool())
+    with app.app_context(), pytest.raises(HasherBusy):
+        pool_hasher.hash("pw")
+
+
+def test_full_queue_is_busy_without_waiting(monkeypatch):
+    from concurrent.futures import Future
+    from flask import Flask
+    from app.utils.security import HasherBusy, PasswordHasher
+
+    app = Flask(__name__)
+    app.config.update(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_MAX_PENDING=1, PASSWORD_HASH_TIMEOUT=0.01)
+    pool_hasher = PasswordHasher(app)
+    futures = []
+
+    class StuckPool:
+        def submit(self, fn, *args):
+            futures.append(Future())
+            futures[-1].set_running_or_notify_cancel()  # already running: cancel() cannot stop it
+            return futures[-1]
+
+    monkeypatch.setattr(pool_hasher, "_pool", lambda state: StuckPool())
+    with app.app_context():
+        with pytest.raises(HasherBusy, match="timed out"):
+            pool_hasher.hash("pw")
+        # the timed-out KDF is still running and keeps its slot
+        app.config["PASSWORD_HASH_TIMEOUT"] = 10
+        started = time.perf_counter()
+        with pytest.raises(HasherBusy, match="queue is full"):
+            pool_hasher.hash("pw")
+        assert time.perf_counter() - started < 1
+        assert len(futures) == 1
+
+        futures[0].set_result("$scrypt$...")  # finishing frees the slot
+        app.config["PASSWORD_HASH_TIMEOUT"] = 0.01
+        with pytest.raises(HasherBusy, match="timed out"):
+            pool_hasher.hash("pw")
+        assert len(futures) == 2
@@ -0,0 +1,186 @@
+from app.utils.pagination import encode_cursor
+from app.utils.spatial_index import GridIndex
+
+
+def test_grid_index_only_returns_cells_near_point():
+    index = GridIndex(cell_deg=0.05)
+    index.insert(1, -26.2041, 28.0473)   # Johannesburg
+    index.insert(2, -26.2100, 28.0500)
+    index.insert(3, -33.9249, 18.4241)   # Cape Town
+    keys = {k for k, _, _ in index.query_radius(-26.2041, 28.0473, 5)}
+    assert keys == {1, 2}
+
+
+def test_grid_index_update_and_remove():
+    index = GridIndex(cell_deg=0.05)
+    index.insert(1, 0.0, 0.0)
+    index.insert(1, 10.0, 10.0)  # moved
+    assert index.query_radius(0.0, 0.0, 5) == []
+    assert [k for k, _, _ in index.query_radius(10.0, 10.0, 5)] == [1]
+    index.remove(1)
+    assert len(index) == 0
+    assert index.query_radius(10.0, 10.0, 5) == []
+
+
+def test_grid_index_buckets_and_antimeridian():
+    index = GridIndex(cell_deg=0.05)
+    index.insert(1, 0.0, 179.99, bucket="plumbing")
+    index.insert(2, 0.0, -179.99, bucket="plumbing")
+    index.insert(3, 0.0, -179.99, bucket="tutoring")
+    keys = {k for k, _, _ in index.query_radius(0.0, 179.99, 10, bucket="plumbing")}
+    assert keys == {1, 2}
+
+
+def test_matches_see_offers_created_after_index_build(client, auth_headers):
+    req = client.post("/services/requests", json={
+        "title": "Fix tap", "description": "Leaking", "category": "plumbing",
+        "latitude": -26.20, "longitude": 28.04, "radius_km": 5,
+    }, headers=auth_headers)
+    request_id = req.get_json()["id"]
+    client.post("/services/offers", json={
+        "title": "Plumber A", "description": "24h", "category": "plumbing",
+        "latitude": -26.21, "longitude": 28.05,
+    }, headers=auth_headers)
+
+    first = client.get(f"/services/matches/{request_id}").get_json()
+    assert [o["title"] for o in first] == ["Plumber A"]
+
+    client.post("/services/offers", json={
+        "title": "Plumber B", "description": "Weekends", "category": "plumbing",
+        "latitude": -26.20, "longitude": 28.041,
+    }, headers=auth_headers)
+    client.post("/services/offers", json={
+        "title": "Far plumber", "description": "Durban", "category": "plumbing",
+        "latitude": -29.85, "longitude": 31.02,
+    }, headers=auth_headers)
+
+    second = client.get(f"/services/matches/{request_id}").get_json()
+    assert [o["title"] for o in second] == ["Plumber B", "Plumber A"]
+
+
+def test_list_posts_radius_uses_persisted_geohash(app, client, auth_headers):
+    from app.extensions import db
+    from app.models import Post
+    res = client.post("/posts/", json={
+        "title": "Soweto spaza", "content": "Open late",
+        "latitude": -26.2485, "longitude": 27.8540,
+    }, headers=auth_headers)
+    post_id = res.get_json()["id"]
+    with app.app_context():
+        assert db.session.get(Post, post_id).geohash.startswith("ke7")
+
+    data = client.get("/posts/?lat=-26.25&lon=27.85&radius_km=2").get_json()
+    assert [p["title"] for p in data["items"]] == ["Soweto spaza"]
+
+
+def test_grid_index_nearest_matches_brute_force():
+    import random
+    from app.utils.geo import haversine_km
+
+    rng = random.Random(7)
+    index = GridIndex(cell_deg=0.05)
+    points = {i: (-26.2 + rng.uniform(-0.5, 0.5), 28.0 + rng.uniform(-0.5, 0.5)) for i in range(500)}
+    for key, (lat, lon) in points.items():
+        index.insert(key, lat, lon)
+
+    got = index.nearest(-26.2, 28.0, 10)
+    expected = sorted((float(haversine_km(-26.2, 28.0, [la], [lo])[0]), k) for k, (la, lo) in points.items())
+    assert [k for k, _ in got] == [k for _, k in expected[:10]]
+    assert index.nearest(-26.2, 28.0, 10, max_km=0.001) == []
+
+
+def test_nearest_posts_and_offers(client, auth_headers):
+    for i in range(5):
+        client.post("/posts/", json={"title": f"Tembisa {i}", "content": "x",
+                                     "latitude": -25.99 - i * 0.01, "longitude": 28.22}, headers=auth_headers)
+    data = client.get("/posts/?lat=-25.99&lon=28.22&nearest=3").get_json()
+    assert [p["title"] for p in data["items"]] == ["Tembisa 0", "Tembisa 1", "Tembisa 2"]
+
+    for i in range(3):
+        client.post("/services/offers", json={"title": f"Welder {i}", "description": "x", "category": "welding",
+                                              "latitude": -25.99 - i * 0.02, "longitude": 28.22},
+                    headers=auth_headers)
+    res = client.get("/services/offers/nearest?lat=-25.99&lon=28.22&category=welding&k=2")
+    assert [o["title"] for o in res.get_json()] == ["Welder 0", "Welder 1"]
+    assert client.get("/services/offers/nearest?lat=1&lon=1").status_code == 400
+
+
+def test_nearest_posts_respect_user_id(app, client, auth_headers):
+    from app.extensions import db
+    from app.models import Post, User
+
+    other = User(username="nearest_other", email="nearest_other@example.com", _password="x")
+    db.session.add(other)
+    db.session.flush()
+    db.session.add(Post(title="Other's", content="x", user_id=other.id, latitude=-25.5, longitude=28.5))
+    db.session.commit()
+    client.post("/posts/", json={"title": "Mine", "content": "x", "latitude": -25.51, "longitude": 28.5},
+                headers=auth_headers)
+
+    assert client.get("/posts/?lat=-25.5&lon=28.5&nearest=1").get_json()["items"][0]["title"] == "Other's"
+    mine = client.get("/posts/?lat=-25.5&lon=28.5&nearest=2&user_id=1").get_json()["items"]
+    assert [p["title"] for p in mine][:1] == ["Mine"] and {p["user_id"] for p in mine} == {1}
+    theirs = client.get(f"/posts/?lat=-25.5&lon=28.5&nearest=5&radius_km=5&user_id={other.id}").get_json()
+    assert [p["title"] for p in theirs["items"]] == ["Other's"]
+
+
+def test_spatial_cursor_pages_are_stable_and_complete(client, auth_headers):
+    ids = []
+    for i in range(7):
+        res = client.post("/posts/", json={"title": f"Khayelitsha {i}", "content": "x",
+                                           "latitude": -34.04 - (i // 2) * 0.003, "longitude": 18.67},
+                          headers=auth_headers)
+        ids.append(res.get_json()["id"])
+
+    seen = []
+    cursor = ""
+    while cursor is not None:
+        data = client.get(f"/posts/?lat=-34.04&lon=18.67&radius_km=3&limit=3&cursor={cursor}").get_json()
+        assert len(data["items"]) <= 3
+        seen.extend(p["id"] for p in data["items"])
+        cursor = data["next_cursor"]
+
+    # equal distances come out in id order, no duplicates or gaps
+    assert seen == ids
+
+    by_user = client.get("/posts/?lat=-34.04&lon=18.67&radius_km=3&limit=3&cursor=&user_id=1").get_json()
+    assert [p["id"] for p in by_user["items"]] == ids[:3]
+    assert client.get("/posts/?lat=-34.04&lon=18.67&radius_km=3&cursor=garbage").status_code == 400
+    wrong_types = encode_cursor("x", "y")
+    for extra in ("", "&user_id=1"):
+        url = f"/posts/?lat=-34.04&lon=18.67&radius_km=3&cursor={wrong_types}{extra}"
+        assert client.get(url).status_code == 400
+
+
+def test_grid_index_nearest_after_skips_earlier_results():
+    index = GridIndex(cell_deg=0.05)
+    for i in range(50):
+        index.insert(i, 0.0, i * 0.01)
+    first = index.nearest(0.0, 0.0, 10)
+    d, key = first[-1][1], first[-1][0]
+    second = index.nearest(0.0, 0.0, 10, after=(d, key))
+    assert [k for k, _ in first + second] == list(range(20))
+
+
+def test_index_catches_up_with_other_processes_writes(app, client, auth_headers, monkeypatch):
+    from sqlalchemy import insert
+    from app.extensions import db
+    from app.models import Post
+    nearby = "/posts/nearby?lat=-33.92&lon=18.42&radius_km=2"
+    assert client.get(nearby).get_json() == []
+
+    # a Core insert fires no session events, like a write made by another worker
+    with app.app_context():
+        db.session.execute(insert(Post.__table__).values(
+            title="Sea Point market", content="Sundays", user_id=1, latitude=-33.921, longitude=18.421))
+        db.session.commit()
+
+    monkeypatch.setitem(app.config, "SPATIAL_INDEX_SYNC_SECONDS", 3600)
+    stale = client.get(nearby)
+    assert stale.get_json() == []
+
+    monkeypatch.setitem(app.config, "SPATIAL_INDEX_SYNC_SECONDS", 0)
+    fresh = client.get(nearby, headers={"If-None-Match": stale.headers["ETag"]})
+    assert fresh.status_code == 200
+    assert [p["title"] for p in fresh.get_json()] == ["Sea Point market"]
+    assert fresh.headers["ETag"] != stale.headers["ETag"]
@@ -0,0 +1,85 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def no_sync_lag(app, monkeypatch):
+    # hand out rows as soon as they are committed; the lag itself is tested below
+    monkeypatch.setitem(app.config, "SYNC_SAFETY_LAG_SECONDS", 0)
+
+
+def test_sync_returns_only_changes_since_token(client, auth_headers):
+    first = client.get("/sync", headers=auth_headers).get_json()
+    token = first["next"]
+    while first["has_more"]:
+        first = client.get(f"/sync?since={token}", headers=auth_headers).get_json()
+        token = first["next"]
+
+    post_id = client.post("/posts/", json={"title": "Synced", "content": "x"},
+                          headers=auth_headers).get_json()["id"]
+    client.post("/services/offers", json={"title": "Synced offer", "description": "d",
+                                          "category": "sync"}, headers=auth_headers)
+
+    delta = client.get(f"/sync?since={token}", headers=auth_headers).get_json()
+    assert [p["id"] for p in delta["posts"]] == [post_id]
+    assert [o["title"] for o in delta["offers"]] == ["Synced offer"]
+    assert delta["requests"] == []
+
+    # nothing changed since the new token
+    quiet = client.get(f"/sync?since={delta['next']}", headers=auth_headers).get_json()
+    assert quiet["posts"] == quiet["offers"] == quiet["requests"] == []
+
+
+def test_deleted_post_becomes_tombstone(client, auth_headers):
+    token = client.get("/sync?limit=1000", headers=auth_headers).get_json()["next"]
+    post_id = client.post("/posts/", json={"title": "Gone soon", "content": "x",
+                                           "latitude": 5.0, "longitude": 5.0},
+                          headers=auth_headers).get_json()["id"]
+    assert client.delete(f"/posts/{post_id}", headers=auth_headers).status_code == 200
+
+    assert client.get(f"/posts/{post_id}").status_code == 404
+    assert client.delete(f"/posts/{post_id}", headers=auth_headers).status_code == 404
+    assert post_id not in [p["id"] for p in client.get("/posts/?limit=100").get_json()["items"]]
+    assert client.get("/posts/nearby?lat=5&lon=5&radius_km=1").get_json() == []
+
+    delta = client.get(f"/sync?since={token}", headers=auth_headers).get_json()
+    assert [(p["id"], p["deleted"]) for p in delta["posts"]] == [(post_id, True)]
+
+
+def test_deleted_offers_and_requests_become_tombstones(client, auth_headers):
+    token = client.get("/sync?limit=1000", headers=auth_headers).get_json()["next"]
+    offer_id = client.post("/services/offers", json={"title": "Gone offer", "description": "d",
+                                                     "category": "tombstone", "latitude": 6.0,
+                                                     "longitude": 6.0}, headers=auth_headers).get_json()["id"]
+    request_id = client.post("/services/requests", json={"title": "Gone request", "description": "d",
+                                                         "category": "tombstone", "latitude": 6.0,
+                                                         "longitude": 6.0}, headers=auth_headers).get_json()["id"]
+    assert [o["id"] for o in client.get(f"/services/matches/{request_id}").get_json()] == [offer_id]
+
+    assert client.delete(f"/services/offers/{offer_id}", headers=auth_headers).status_code == 200
+    assert client.delete(f"/services/offers/{offer_id}", headers=auth_headers).status_code == 404
+    assert client.get("/services/offers/nearest?lat=6&lon=6&category=tombstone").get_json() == []
+    assert client.delete(f"/services/requests/{request_id}", headers=auth_headers).status_code == 200
+    assert client.get(f"/services/matches/{request_id}").status_code == 404
+
+    delta = client.get(f"/sync?since={token}", headers=auth_headers).get_json()
+    assert [(o["id"], o["deleted"]) for o in delta["offers"]] == [(offer_id, True)]
+    assert [(r["id"], r["deleted"]) for r in delta["requests"]] == [(request_id, True)]
+
+
+def test_sync_requires_auth_and_rejects_bad_token(client, auth_headers):
+    assert client.get("/sync").status_code == 401
+    assert client.get("/sync?since=bogus", headers=auth_headers).status_code == 400
+
+
+def test_sync_token_stops_short_of_recent_writes(app, client, auth_headers, monkeypatch):
+    token = client.get("/sync?limit=1000", headers=auth_headers).get_json()["next"]
+    monkeypatch.setitem(app.config, "SYNC_SAFETY_LAG_SECONDS", 3600)
+    post_id = client.post("/posts/", json={"title": "Still committing", "content": "x"},
+                          headers=auth_headers).get_json()["id"]
+
+    held_back = client.get(f"/sync?since={token}", headers=auth_headers).get_json()
+    assert held_back["posts"] == []
+
+    monkeypatch.setitem(app.config, "SYNC_SAFETY_LAG_SECONDS", 0)
+    delta = client.get(f"/sync?since={held_back['next']}", headers=auth_headers).get_json()
+    assert [p["id"] for p in delta["posts"]] == [post_id]